@@ -3,24 +3,27 @@
 Ponto de entrada principal do agente de geração de testes unitários.
 """
 
+import asyncio
+import logging
 import os
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Any, Dict
 
-# Configura encoding UTF-8 para o console (Windows)
-if sys.platform == 'win32':
+# Configura encoding UTF-8 para o console (Windows). `reconfigure` ajusta o
+# TextIOWrapper existente, sem empilhar um StreamWriter Python a cada print.
+if sys.platform == 'win32' and hasattr(sys.stdout, 'reconfigure'):
     try:
-        # Tenta configurar o console para UTF-8
-        import codecs
-        sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-        sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
-    except:
+        if (sys.stdout.encoding or '').lower() != 'utf-8':
+            sys.stdout.reconfigure(encoding='utf-8')
+        if (sys.stderr.encoding or '').lower() != 'utf-8':
+            sys.stderr.reconfigure(encoding='utf-8')
+    except Exception:
         # Se falhar, continua sem encoding especial
         pass
 
-from src.agent.graph import criar_grafo_agente
-from src.agent.state import EstadoAgente
+# Módulos pesados (langgraph, langchain, clientes de LLM) são importados apenas
+# depois da validação dos argumentos, dentro de `main_async`
 
 
 def carregar_configuracao():
@@ -30,15 +33,36 @@ def carregar_configuracao():
         print("⚠️  Arquivo .env não encontrado. Usando variáveis de ambiente do sistema.")
         print("   Para configurar, copie .env.example para .env e edite com suas chaves.")
     else:
+        from dotenv import load_dotenv
+        
         load_dotenv(arquivo_env)
         print("✅ Configurações carregadas do arquivo .env")
 
 
+def configurar_logging():
+    """
+    Configura as mensagens de progresso dos nós (logger `cover_check`).
+    
+    O nível vem de AGENT_LOG_LEVEL (ou LOG_LEVEL), padrão INFO. Com WARNING,
+    apenas avisos e erros são exibidos.
+    """
+    nivel = (os.getenv("AGENT_LOG_LEVEL") or os.getenv("LOG_LEVEL") or "INFO").strip().upper()
+    
+    manipulador = logging.StreamHandler(sys.stdout)
+    manipulador.setFormatter(logging.Formatter("%(message)s"))
+    
+    logger = logging.getLogger("cover_check")
+    logger.addHandler(manipulador)
+    logger.setLevel(getattr(logging, nivel, logging.INFO))
+    # Não repassa ao logger raiz, para não duplicar mensagens
+    logger.propagate = False
+
+
 def criar_estado_inicial(
     codigo_fonte: str,
     caminho_arquivo: str = None,
     caminho_projeto: str = None
-) -> EstadoAgente:
+) -> Dict[str, Any]:
     """
     Cria o estado inicial do agente.
     
@@ -48,15 +72,18 @@ def criar_estado_inicial(
         caminho_projeto: Caminho do projeto (opcional)
     
     Returns:
-        Estado inicial do agente
+        Estado inicial do agente (dict com os campos de `EstadoAgente`;
+        o LangGraph preenche os demais com os defaults da dataclass)
     """
     meta_cobertura = float(os.getenv("TARGET_COVERAGE_PERCENTAGE", "80"))
     max_iteracoes = int(os.getenv("MAX_ITERATIONS", "5"))
+    modo = os.getenv("COVERAGE_MODE", "diff").strip().lower()
     
     return {
         "codigo_fonte": codigo_fonte,
         "testes_existentes": "",
         "testes_gerados": [],
+        "validacao_ultimo_teste": None,
         "percentual_cobertura": 0.0,
         "meta_cobertura": meta_cobertura,
         "iteracao": 0,
@@ -66,6 +93,7 @@ def criar_estado_inicial(
         "caminho_arquivo": caminho_arquivo,
         "caminho_projeto": caminho_projeto,
         "deve_continuar": False,
+        "modo": modo,
         # Validações da primeira etapa
         "eh_repositorio_git": False,
         "branch_base": None,
@@ -74,13 +102,13 @@ def criar_estado_inicial(
         # Análise de diff Git
         "arquivos_modificados": {},
         "total_linhas_modificadas": 0,
-        "arquivos_cs_modificados": [],
+        "arquivos_cs_modificados": (),
         # Descoberta de projetos .NET
-        "arquivos_csproj": [],
-        "projetos_teste": [],
+        "arquivos_csproj": (),
+        "projetos_teste": (),
         "dotnet_instalado": False,
-        "sdks_instalados": [],
-        "frameworks_necessarios": set(),
+        "sdks_instalados": (),
+        "frameworks_necessarios": (),
         "sdks_ok": False,
         "reportgenerator_instalado": False,
         "coverlet_ok": False,
@@ -95,8 +123,8 @@ def criar_estado_inicial(
     }
 
 
-def main():
-    """Função principal."""
+async def main_async():
+    """Função principal (assíncrona)."""
     print("=" * 80)
     print("🤖 AGENTE DE GERAÇÃO DE TESTES UNITÁRIOS")
     print("=" * 80)
@@ -104,6 +132,7 @@ def main():
     
     # Carrega configurações
     carregar_configuracao()
+    configurar_logging()
     print()
     
     # Verifica se foi fornecido código fonte
@@ -133,8 +162,7 @@ def main():
     # Lê o código fonte
     print(f"📖 Lendo arquivo: {caminho_arquivo}")
     try:
-        with open(caminho_arquivo, 'r', encoding='utf-8') as f:
-            codigo_fonte = f.read()
+        codigo_fonte = caminho_arquivo.read_text(encoding='utf-8')
     except Exception as e:
         print(f"❌ Erro ao ler arquivo: {e}")
         sys.exit(1)
@@ -154,24 +182,41 @@ def main():
     print()
     
     try:
-        app = criar_grafo_agente()
+        from src.agent.graph import criar_grafo_agente
+        
+        # Execução única: sem checkpointer (não há retomada de thread)
+        app = criar_grafo_agente(checkpointer=None)
         
         # Executa o agente
         config = {"configurable": {"thread_id": "1"}}
         estado_final = None
         
-        for estado in app.stream(estado_inicial, config):
-            # Processa cada estado retornado
-            for nome_no, estado_no in estado.items():
-                if nome_no != "__end__":
-                    print(f"📍 Nó executado: {nome_no}")
-                    estado_final = estado_no
+        # "updates": nós executados; "messages": tokens do LLM à medida que
+        # chegam; "values": estado completo após cada passo
+        async for modo, dados in app.astream(
+            estado_inicial,
+            config,
+            stream_mode=["updates", "messages", "values"]
+        ):
+            if modo == "messages":
+                trecho, _metadados = dados
+                if trecho.content:
+                    print(trecho.content, end="", flush=True)
+            elif modo == "values":
+                estado_final = dados
+            else:
+                # Processa cada atualização retornada
+                for nome_no in dados:
+                    if nome_no != "__end__":
+                        print(f"📍 Nó executado: {nome_no}")
         
-        # Exibe resultados finais
-        print()
-        print("=" * 80)
-        print("📊 RESULTADOS FINAIS")
-        print("=" * 80)
+        # Exibe resultados finais (monta o bloco inteiro e escreve de uma vez)
+        linhas_resultado = [
+            "",
+            "=" * 80,
+            "📊 RESULTADOS FINAIS",
+            "=" * 80
+        ]
         
         if estado_final:
             testes_gerados = estado_final.get("testes_gerados", [])
@@ -179,24 +224,26 @@ def main():
             meta = estado_final.get("meta_cobertura", 80.0)
             erros = estado_final.get("erros", [])
             
-            print(f"✅ Testes gerados: {len(testes_gerados)}")
-            print(f"📈 Cobertura: {cobertura:.1f}% (meta: {meta:.1f}%)")
+            linhas_resultado.append(f"✅ Testes gerados: {len(testes_gerados)}")
+            linhas_resultado.append(f"📈 Cobertura: {cobertura:.1f}% (meta: {meta:.1f}%)")
             
             if erros:
-                print(f"⚠️  Erros encontrados: {len(erros)}")
-                for erro in erros:
-                    print(f"   - {erro}")
+                linhas_resultado.append(f"⚠️  Erros encontrados: {len(erros)}")
+                linhas_resultado.extend(f"   - {erro}" for erro in erros)
+        
+        sys.stdout.write("\n".join(linhas_resultado) + "\n")
+        
+        # Salva testes gerados
+        if estado_final and testes_gerados:
+            arquivo_saida = caminho_arquivo.parent / f"{caminho_arquivo.stem}_GeneratedTests.cs"
+            # Monta o arquivo inteiro em memória e grava com uma única escrita
+            conteudo = "".join(
+                f"// Teste gerado #{i}\n{teste}\n\n"
+                for i, teste in enumerate(testes_gerados, 1)
+            )
+            arquivo_saida.write_text(conteudo, encoding='utf-8')
             
-            # Salva testes gerados
-            if testes_gerados:
-                arquivo_saida = caminho_arquivo.parent / f"{caminho_arquivo.stem}_GeneratedTests.cs"
-                with open(arquivo_saida, 'w', encoding='utf-8') as f:
-                    for i, teste in enumerate(testes_gerados, 1):
-                        f.write(f"// Teste gerado #{i}\n")
-                        f.write(teste)
-                        f.write("\n\n")
-                
-                print(f"💾 Testes salvos em: {arquivo_saida}")
+            print(f"💾 Testes salvos em: {arquivo_saida}")
         
         print()
         print("✅ Processo concluído!")
@@ -211,5 +258,14 @@ def main():
         sys.exit(1)
 
 
+def main():
+    """Ponto de entrada síncrono: executa o agente no event loop."""
+    try:
+        asyncio.run(main_async())
+    except KeyboardInterrupt:
+        print("\n⚠️  Processo interrompido pelo usuário")
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
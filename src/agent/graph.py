@@ -1,15 +1,16 @@
 """Definição do grafo LangGraph do agente."""
 
-from typing import Literal
+from functools import lru_cache
+from typing import Literal, Optional
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.base import BaseCheckpointSaver
 
 from .state import EstadoAgente
 from .nodes import (
-    no_validar_ambiente,
+    no_validar_ambiente_async,
     no_executar_cobertura,
-    no_analisar_codigo,
-    no_gerar_testes,
+    no_analisar_codigo_async,
+    no_gerar_testes_async,
     no_validar_testes,
     no_verificar_cobertura
 )
@@ -53,40 +54,31 @@ def validacao_ok(estado: EstadoAgente) -> Literal["continuar", "fim"]:
     return "continuar"
 
 
-def incrementar_iteracao(estado: EstadoAgente) -> dict:
+@lru_cache(maxsize=1)
+def criar_grafo_agente(checkpointer: Optional[BaseCheckpointSaver] = None):
     """
-    Incrementa o contador de iterações.
+    Cria e retorna o grafo do agente.
     
     Args:
-        estado: Estado atual do agente
+        checkpointer: Checkpointer do LangGraph (ex: `MemorySaver()` ou um saver
+            SQLite para execuções retomáveis). Se None, o grafo é compilado sem
+            checkpoint, evitando serializar o estado a cada super-step em
+            execuções únicas como a do CLI.
     
     Returns:
-        Estado atualizado com iteração incrementada
-    """
-    iteracao_atual = estado.get("iteracao", 0)
-    return {
-        "iteracao": iteracao_atual + 1
-    }
-
-
-def criar_grafo_agente():
-    """
-    Cria e retorna o grafo do agente.
-    
-    Returns:
-        Grafo LangGraph configurado
+        Grafo LangGraph configurado (compilado uma única vez por checkpointer)
     """
     # Cria o grafo
     workflow = StateGraph(EstadoAgente)
     
-    # Adiciona os nós
-    workflow.add_node("validar_ambiente", no_validar_ambiente)
+    # Adiciona os nós (validação, análise e geração são assíncronos;
+    # o grafo deve ser executado com `ainvoke`/`astream`)
+    workflow.add_node("validar_ambiente", no_validar_ambiente_async)
     workflow.add_node("executar_cobertura", no_executar_cobertura)
-    workflow.add_node("analisar_codigo", no_analisar_codigo)
-    workflow.add_node("gerar_testes", no_gerar_testes)
+    workflow.add_node("analisar_codigo", no_analisar_codigo_async)
+    workflow.add_node("gerar_testes", no_gerar_testes_async)
     workflow.add_node("validar_testes", no_validar_testes)
     workflow.add_node("verificar_cobertura", no_verificar_cobertura)
-    workflow.add_node("incrementar_iteracao", incrementar_iteracao)
     
     # Define o ponto de entrada (primeira etapa: validação)
     workflow.set_entry_point("validar_ambiente")
@@ -107,22 +99,23 @@ def criar_grafo_agente():
     workflow.add_edge("gerar_testes", "validar_testes")
     workflow.add_edge("validar_testes", "verificar_cobertura")
     
-    # Adiciona condição após verificar cobertura
+    # Adiciona condição após verificar cobertura. O loop volta direto para
+    # gerar mais testes: o incremento da iteração já é feito em
+    # `verificar_cobertura`, sem um super-step extra.
     workflow.add_conditional_edges(
         "verificar_cobertura",
         deve_continuar,
         {
-            "continuar": "incrementar_iteracao",
+            "continuar": "gerar_testes",
             "fim": END
         }
     )
     
-    # Loop: incrementa iteração e volta para gerar mais testes
-    workflow.add_edge("incrementar_iteracao", "gerar_testes")
-    
-    # Compila o grafo com checkpoint para memória
-    memoria = MemorySaver()
-    app = workflow.compile(checkpointer=memoria)
+    # Compila o grafo (com checkpoint apenas se solicitado)
+    if checkpointer is None:
+        app = workflow.compile()
+    else:
+        app = workflow.compile(checkpointer=checkpointer)
     
     return app
 
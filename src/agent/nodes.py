@@ -1,20 +1,26 @@
 """Nós do grafo LangGraph."""
 
-from typing import Dict, Any
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, Any, Optional
 from pathlib import Path
-from src.agent.state import EstadoAgente
-from src.test_generator.generator import GeradorTestes
+from src.agent.state import EstadoAgente, TabelaProjetosTeste, AcaoHistorico
 from src.agent.tools import analisar_estrutura_codigo, validar_codigo_teste
 from src.validacao.git import (
     verificar_repositorio_git, 
     detectar_branch_base, 
     obter_branch_atual,
-    obter_arquivos_e_linhas_modificadas
+    obter_diff_por_extensao,
+    contar_linhas_modificadas
 )
 from src.validacao.dotnet import (
     encontrar_arquivos_csproj,
     identificar_projetos_teste,
-    verificar_dotnet_instalado,
+    obter_versao_dotnet,
     listar_sdks_instalados,
     verificar_sdks_necessarios,
     obter_target_framework,
@@ -23,167 +29,286 @@ from src.validacao.dotnet import (
     verificar_coverlet_projetos,
     instalar_coverlet_projeto
 )
-from src.validacao.cobertura import (
-    executar_testes_com_cobertura,
-    mesclar_arquivos_cobertura,
-    gerar_relatorio_html,
-    filtrar_cobertura_por_diff,
-    extrair_resumo_cobertura
+from src.validacao.cache import (
+    calcular_impressao_ambiente,
+    carregar_ambiente_cache,
+    salvar_ambiente_cache
 )
-from src.validacao.utilidades import imprimir_cabecalho
+from src.validacao.utilidades import imprimir_cabecalho, imprimir_info
 
+# O gerador (e a pilha de LLM) é importado sob demanda em `_gerador`, e as
+# funções de cobertura dentro de `no_executar_cobertura`
+if TYPE_CHECKING:
+    from src.test_generator.generator import GeradorTestes
 
-def no_validar_ambiente(estado: EstadoAgente) -> Dict[str, Any]:
+
+# Número máximo de threads usadas nas sondagens do ambiente
+MAX_WORKERS_SONDAGEM = 8
+
+# Mensagens de progresso dos nós; o nível é configurado pelo ponto de entrada
+# (AGENT_LOG_LEVEL=WARNING silencia o progresso em execuções de CI)
+log = logging.getLogger("cover_check.nodes")
+
+
+@lru_cache(maxsize=1)
+def _gerador() -> "GeradorTestes":
     """
-    Nó: Valida o ambiente (primeira etapa - sem LLM).
-    Valida repositório Git, SDKs, ReportGenerator, Coverlet, etc.
+    Retorna o gerador de testes compartilhado entre as iterações.
+    
+    O cliente do LLM (e seu pool de conexões HTTP) é criado apenas uma vez;
+    se a criação falhar, a exceção não é cacheada e a próxima chamada tenta de novo.
+    O import é local para que os nós sem LLM não carreguem os clientes de LLM.
+    """
+    from src.test_generator.generator import GeradorTestes
+    
+    return GeradorTestes()
+
+
+def _sondar_dotnet(caminho_projeto_path: Path) -> Dict[str, Any]:
+    """
+    Sonda os projetos e as ferramentas .NET, reaproveitando o cache em disco.
+    
+    A impressão digital (mtime/tamanho dos .csproj + `dotnet --version`) é
+    calculada primeiro; se houver validação salva para ela, os dados
+    derivados dos .csproj (projetos de teste, frameworks, Coverlet) vêm do
+    cache. SDKs e ReportGenerator são instalações globais, fora da
+    impressão: sempre são sondados, em paralelo.
     
     Args:
-        estado: Estado atual do agente
+        caminho_projeto_path: Caminho do projeto
     
     Returns:
-        Atualizações para o estado
+        Dict com o resultado das sondagens .NET
     """
-    imprimir_cabecalho("ETAPA 1: VALIDAÇÃO DO AMBIENTE")
-    
-    caminho_projeto = estado.get("caminho_projeto")
-    if not caminho_projeto:
-        return {
-            "erros": estado.get("erros", []) + ["Caminho do projeto não fornecido"],
-            "validacoes_concluidas": False
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futuro_csproj = executor.submit(encontrar_arquivos_csproj, caminho_projeto_path)
+        versao_dotnet = obter_versao_dotnet()
+        # Tuplas: seguem imutáveis para o estado e são compartilhadas sem cópia
+        arquivos_csproj = tuple(futuro_csproj.result())
+        
+        sondagem = {
+            "arquivos_csproj": arquivos_csproj,
+            "dotnet_instalado": versao_dotnet is not None,
+            "sdks_instalados": (),
+            "reportgenerator_instalado": False,
+            "impressao_ambiente": None,
+            "ambiente_cache": None
         }
+        
+        if versao_dotnet is None:
+            return sondagem
+        
+        impressao = calcular_impressao_ambiente(arquivos_csproj, versao_dotnet)
+        sondagem["impressao_ambiente"] = impressao
+        
+        futuro_sdks = executor.submit(listar_sdks_instalados)
+        
+        ambiente_cache = carregar_ambiente_cache(impressao)
+        if ambiente_cache is not None:
+            imprimir_info("Análise dos projetos .NET reaproveitada do cache (.csproj e SDK inalterados)")
+            sondagem["ambiente_cache"] = ambiente_cache
+        
+        sondagem["reportgenerator_instalado"] = verificar_reportgenerator_instalado()
+        sondagem["sdks_instalados"] = tuple(futuro_sdks.result())
+    
+    return sondagem
+
+
+async def _sondar_ambiente_async(caminho_projeto_path: Path) -> Dict[str, Any]:
+    """
+    Executa as sondagens do ambiente (Git, diff, .NET, ReportGenerator).
+    
+    Primeiro confirma que o caminho é um repositório Git; depois as sondagens
+    independentes rodam em threads concorrentes, para que o tempo total seja
+    o da mais lenta, e não a soma de todas. O diff depende apenas da branch
+    base e é calculado assim que ela é detectada, em paralelo com as demais.
+    
+    Args:
+        caminho_projeto_path: Caminho do projeto
+    
+    Returns:
+        Dict com o resultado de cada sondagem
+    """
+    if not await asyncio.to_thread(verificar_repositorio_git, caminho_projeto_path):
+        return {"eh_repositorio": False}
+    
+    async def _branch_base_e_diff():
+        branch_base = await asyncio.to_thread(detectar_branch_base, caminho_projeto_path)
+        if not branch_base:
+            return branch_base, None
+        diff = await asyncio.to_thread(
+            obter_diff_por_extensao, caminho_projeto_path, branch_base
+        )
+        return branch_base, diff
+    
+    (branch_base, diff), branch_atual, sondagem_dotnet = await asyncio.gather(
+        _branch_base_e_diff(),
+        asyncio.to_thread(obter_branch_atual, caminho_projeto_path),
+        asyncio.to_thread(_sondar_dotnet, caminho_projeto_path)
+    )
+    
+    return {
+        "eh_repositorio": True,
+        "branch_base": branch_base,
+        "branch_atual": branch_atual,
+        "diff": diff,
+        **sondagem_dotnet
+    }
+
+
+def _falha_validacao(atualizacoes: Dict[str, Any], erro: str) -> Dict[str, Any]:
+    """
+    Monta o retorno de uma validação interrompida por erro.
+    
+    Args:
+        atualizacoes: Atualizações já coletadas até o ponto da falha
+        erro: Mensagem de erro
+    
+    Returns:
+        Atualizações para o estado, com o erro e a validação marcada como não concluída
+    """
+    return {
+        **atualizacoes,
+        "erros": [erro],
+        "validacoes_concluidas": False
+    }
+
+
+def _concluir_validacao_ambiente(
+    caminho_projeto_path: Path,
+    sondagem: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Conclui a validação do ambiente a partir do resultado das sondagens.
     
-    caminho_projeto_path = Path(caminho_projeto)
+    Args:
+        caminho_projeto_path: Caminho do projeto
+        sondagem: Resultado de `_sondar_ambiente_async`
     
+    Returns:
+        Atualizações para o estado
+    """
     # 1. Validação do repositório Git
-    print("\n📋 Validando repositório Git...")
-    eh_repositorio = verificar_repositorio_git(caminho_projeto_path)
+    eh_repositorio = sondagem["eh_repositorio"]
     
     if not eh_repositorio:
-        return {
-            "eh_repositorio_git": False,
-            "erros": estado.get("erros", []) + ["O caminho fornecido não é um repositório Git válido"],
-            "validacoes_concluidas": False
-        }
+        return _falha_validacao(
+            {"eh_repositorio_git": False, "caminho_projeto_path": caminho_projeto_path},
+            "O caminho fornecido não é um repositório Git válido"
+        )
     
-    # 2. Detecta branch base e atual
-    branch_base = detectar_branch_base(caminho_projeto_path)
-    branch_atual = obter_branch_atual(caminho_projeto_path)
+    # 2. Branch base e atual
+    branch_base = sondagem["branch_base"]
+    branch_atual = sondagem["branch_atual"]
     
-    print(f"✅ Repositório Git validado")
+    log.info(f"✅ Repositório Git validado")
     if branch_base:
-        print(f"   Branch base: {branch_base}")
+        log.info(f"   Branch base: {branch_base}")
     if branch_atual:
-        print(f"   Branch atual: {branch_atual}")
+        log.info(f"   Branch atual: {branch_atual}")
     
-    # 3. Calcula diff Git (arquivos e linhas modificadas)
-    arquivos_modificados = {}
-    arquivos_cs_modificados = []
+    # 3. Diff Git (arquivos e linhas modificadas), calculado durante a sondagem
+    # já agrupado por extensão: os arquivos C# saem do grupo '.cs', sem varredura
+    diff = sondagem["diff"]
+    arquivos_modificados = diff["total"] if diff else {}
+    arquivos_cs_modificados = ()
     total_linhas_modificadas = 0
     
     if branch_base:
-        print("\n📊 Calculando diff Git...")
-        arquivos_modificados = obter_arquivos_e_linhas_modificadas(
-            caminho_projeto_path,
-            branch_base
-        )
-        
-        # Filtra apenas arquivos C# (.cs)
-        arquivos_cs_modificados = [
-            arquivo for arquivo in arquivos_modificados.keys()
-            if arquivo.endswith('.cs')
-        ]
+        arquivos_cs_modificados = tuple(diff["por_extensao"].get(".cs", {}))
+        total_linhas_modificadas = diff["total_linhas"]
         
-        total_linhas_modificadas = sum(len(linhas) for linhas in arquivos_modificados.values())
-        
-        if arquivos_cs_modificados:
-            print(f"\n📝 Arquivos C# modificados: {len(arquivos_cs_modificados)}")
-            for arquivo in arquivos_cs_modificados[:5]:
-                linhas = arquivos_modificados.get(arquivo, set())
-                print(f"   • {arquivo}: {len(linhas)} linhas")
+        if arquivos_cs_modificados and log.isEnabledFor(logging.INFO):
+            # Monta o preview inteiro e imprime de uma vez (só se for exibido)
+            linhas_preview = [f"\n📝 Arquivos C# modificados: {len(arquivos_cs_modificados)}"]
+            linhas_preview.extend(
+                f"   • {arquivo}: {contar_linhas_modificadas(arquivos_modificados[arquivo])} linhas"
+                for arquivo in arquivos_cs_modificados[:5]
+            )
             if len(arquivos_cs_modificados) > 5:
-                print(f"   ... e mais {len(arquivos_cs_modificados) - 5} arquivos")
-        else:
-            print("⚠️  Nenhum arquivo C# modificado detectado no diff")
+                linhas_preview.append(f"   ... e mais {len(arquivos_cs_modificados) - 5} arquivos")
+            log.info("\n".join(linhas_preview))
+        elif not arquivos_cs_modificados:
+            log.warning("⚠️  Nenhum arquivo C# modificado detectado no diff")
     
-    historico = estado.get("historico", [])
-    historico.append({
-        "acao": "validar_ambiente",
+    dados_historico = {
         "repositorio_git": True,
         "branch_base": branch_base,
         "branch_atual": branch_atual,
         "total_arquivos_modificados": len(arquivos_modificados),
         "total_arquivos_cs_modificados": len(arquivos_cs_modificados),
         "total_linhas_modificadas": total_linhas_modificadas
-    })
+    }
     
-    # 4. Descoberta de projetos .NET
-    print("\n📦 Descobrindo projetos .NET...")
-    arquivos_csproj = encontrar_arquivos_csproj(caminho_projeto_path)
+    # Atualizações comuns a todos os retornos a partir daqui
+    atualizacoes = {
+        "caminho_projeto_path": caminho_projeto_path,
+        "eh_repositorio_git": True,
+        "branch_base": branch_base,
+        "branch_atual": branch_atual,
+        "arquivos_modificados": arquivos_modificados,
+        "arquivos_cs_modificados": arquivos_cs_modificados,
+        "total_linhas_modificadas": total_linhas_modificadas,
+        "historico": [AcaoHistorico("validar_ambiente", dados_historico)]
+    }
+    
+    # 4. Projetos .NET descobertos
+    arquivos_csproj = sondagem["arquivos_csproj"]
+    atualizacoes["arquivos_csproj"] = arquivos_csproj
     
     if not arquivos_csproj:
-        return {
-            "eh_repositorio_git": True,
-            "branch_base": branch_base,
-            "branch_atual": branch_atual,
-            "arquivos_modificados": arquivos_modificados,
-            "arquivos_cs_modificados": arquivos_cs_modificados,
-            "total_linhas_modificadas": total_linhas_modificadas,
-            "arquivos_csproj": [],
-            "erros": estado.get("erros", []) + ["Nenhum arquivo .csproj encontrado no repositório"],
-            "historico": historico,
-            "validacoes_concluidas": False
-        }
+        return _falha_validacao(atualizacoes, "Nenhum arquivo .csproj encontrado no repositório")
+    
+    # Validação .NET salva em disco para os mesmos .csproj e a mesma versão do SDK
+    ambiente_cache = sondagem["ambiente_cache"]
     
     # Identifica projetos de teste
-    projetos_teste = identificar_projetos_teste(arquivos_csproj)
+    if ambiente_cache is not None:
+        projetos_teste = tuple(Path(projeto) for projeto in ambiente_cache["projetos_teste"])
+    else:
+        projetos_teste = tuple(identificar_projetos_teste(arquivos_csproj))
+    atualizacoes["projetos_teste"] = projetos_teste
     
-    # 5. Verificação do .NET SDK
-    print("\n🔧 Verificando .NET SDK...")
-    dotnet_instalado = verificar_dotnet_instalado()
+    # 5. .NET SDK
+    dotnet_instalado = sondagem["dotnet_instalado"]
+    atualizacoes["dotnet_instalado"] = dotnet_instalado
     
     if not dotnet_instalado:
-        return {
-            "eh_repositorio_git": True,
-            "branch_base": branch_base,
-            "branch_atual": branch_atual,
-            "arquivos_modificados": arquivos_modificados,
-            "arquivos_cs_modificados": arquivos_cs_modificados,
-            "total_linhas_modificadas": total_linhas_modificadas,
-            "arquivos_csproj": [str(p) for p in arquivos_csproj],
-            "projetos_teste": [str(p) for p in projetos_teste],
-            "dotnet_instalado": False,
-            "erros": estado.get("erros", []) + [".NET SDK não está instalado"],
-            "historico": historico,
-            "validacoes_concluidas": False
-        }
+        return _falha_validacao(atualizacoes, ".NET SDK não está instalado")
     
-    # Lista SDKs instalados
-    sdks_instalados = listar_sdks_instalados()
+    # SDKs instalados
+    sdks_instalados = sondagem["sdks_instalados"]
     
-    # Coleta frameworks necessários
-    frameworks_necessarios = set()
-    for csproj in arquivos_csproj:
-        framework = obter_target_framework(csproj)
-        if framework:
-            frameworks_necessarios.add(framework)
+    reportgenerator_instalado = sondagem["reportgenerator_instalado"]
+    
+    if ambiente_cache is not None:
+        frameworks_necessarios = tuple(ambiente_cache["frameworks_necessarios"])
+    else:
+        # Coleta frameworks necessários (um parse de XML por .csproj, em paralelo).
+        # O resultado vai para o estado como tupla ordenada: imutável e determinística.
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS_SONDAGEM) as executor:
+            frameworks_necessarios = tuple(sorted({
+                framework
+                for framework in executor.map(obter_target_framework, arquivos_csproj)
+                if framework
+            }))
     
     # Verifica se todos os SDKs necessários estão instalados
-    sdks_ok, frameworks_faltando = verificar_sdks_necessarios(arquivos_csproj, sdks_instalados)
+    # (reaproveita os frameworks já coletados, sem reler os .csproj)
+    sdks_ok, frameworks_faltando = verificar_sdks_necessarios(
+        arquivos_csproj, sdks_instalados, frameworks_necessarios
+    )
     
     if not sdks_ok:
-        print(f"\n⚠️  Alguns SDKs necessários não estão instalados:")
+        log.warning(f"\n⚠️  Alguns SDKs necessários não estão instalados:")
         for framework in frameworks_faltando:
-            print(f"   • {framework}")
-    
-    # 6. Verificação do ReportGenerator
-    print("\n📊 Verificando ReportGenerator...")
-    reportgenerator_instalado = verificar_reportgenerator_instalado()
+            log.warning(f"   • {framework}")
     
+    # 6. ReportGenerator
     # Se não estiver instalado, oferece instalação automática
     if not reportgenerator_instalado:
-        print("\n⚠️  ReportGenerator não está instalado")
-        print("   O ReportGenerator é necessário para gerar relatórios HTML de cobertura")
+        log.warning("\n⚠️  ReportGenerator não está instalado")
+        log.warning("   O ReportGenerator é necessário para gerar relatórios HTML de cobertura")
         
         # Por enquanto, apenas registra que não está instalado
         # A instalação pode ser feita manualmente ou em uma fase posterior
@@ -191,21 +316,36 @@ def no_validar_ambiente(estado: EstadoAgente) -> Dict[str, Any]:
         # reportgenerator_instalado = instalar_reportgenerator()
     
     # 7. Verificação do Coverlet nos projetos de teste
-    print("\n🧪 Verificando Coverlet nos projetos de teste...")
-    coverlet_ok, projetos_sem_coverlet, tipos_coverlet = verificar_coverlet_projetos(projetos_teste)
-    
-    # Se houver projetos sem Coverlet, avisa
-    if not coverlet_ok and projetos_sem_coverlet:
-        print(f"\n⚠️  {len(projetos_sem_coverlet)} projeto(s) de teste sem Coverlet")
-        print("   O Coverlet é necessário para coletar dados de cobertura de código")
+    if ambiente_cache is not None:
+        # Só são salvos projetos com Coverlet em todos os projetos de teste
+        coverlet_ok = True
+        projetos_sem_coverlet = []
+        tipos_coverlet = dict(ambiente_cache["tipos_coverlet"])
+    else:
+        log.info("\n🧪 Verificando Coverlet nos projetos de teste...")
+        coverlet_ok, projetos_sem_coverlet, tipos_coverlet = verificar_coverlet_projetos(projetos_teste)
+        
+        # Se houver projetos sem Coverlet, avisa
+        if not coverlet_ok and projetos_sem_coverlet:
+            log.warning(f"\n⚠️  {len(projetos_sem_coverlet)} projeto(s) de teste sem Coverlet")
+            log.warning("   O Coverlet é necessário para coletar dados de cobertura de código")
+            
+            # Por enquanto, apenas registra
+            # Para instalar automaticamente, descomente as linhas abaixo:
+            # for projeto in projetos_sem_coverlet:
+            #     instalar_coverlet_projeto(projeto, tipo='collector')
         
-        # Por enquanto, apenas registra
-        # Para instalar automaticamente, descomente as linhas abaixo:
-        # for projeto in projetos_sem_coverlet:
-        #     instalar_coverlet_projeto(projeto, tipo='collector')
+        # Salva só o que deriva dos .csproj (coberto pela impressão), e só sem
+        # pendências: um projeto sem Coverlet deve ser reavaliado após a correção
+        if coverlet_ok:
+            salvar_ambiente_cache(sondagem["impressao_ambiente"], {
+                "projetos_teste": [str(projeto) for projeto in projetos_teste],
+                "frameworks_necessarios": list(frameworks_necessarios),
+                "tipos_coverlet": tipos_coverlet
+            })
     
     # Atualiza histórico com informações de projetos .NET
-    historico[-1].update({
+    dados_historico.update({
         "total_csproj": len(arquivos_csproj),
         "total_projetos_teste": len(projetos_teste),
         "dotnet_instalado": dotnet_instalado,
@@ -216,32 +356,120 @@ def no_validar_ambiente(estado: EstadoAgente) -> Dict[str, Any]:
         "projetos_sem_coverlet": len(projetos_sem_coverlet)
     })
     
-    print(f"\n✅ Validação do ambiente concluída")
-    print(f"   Projetos .NET: {len(arquivos_csproj)}")
-    print(f"   Projetos de teste: {len(projetos_teste)}")
-    print(f"   SDKs instalados: {len(sdks_instalados)}")
-    print(f"   SDKs OK: {'Sim' if sdks_ok else 'Não'}")
-    print(f"   ReportGenerator: {'Instalado' if reportgenerator_instalado else 'Não instalado'}")
-    print(f"   Coverlet: {'OK' if coverlet_ok else f'{len(projetos_sem_coverlet)} projeto(s) sem Coverlet'}")
-    
-    return {
-        "eh_repositorio_git": True,
-        "branch_base": branch_base,
-        "branch_atual": branch_atual,
-        "arquivos_modificados": arquivos_modificados,
-        "arquivos_cs_modificados": arquivos_cs_modificados,
-        "total_linhas_modificadas": total_linhas_modificadas,
-        "arquivos_csproj": [str(p) for p in arquivos_csproj],
-        "projetos_teste": [str(p) for p in projetos_teste],
-        "dotnet_instalado": dotnet_instalado,
+    log.info("\n".join([
+        f"\n✅ Validação do ambiente concluída",
+        f"   Projetos .NET: {len(arquivos_csproj)}",
+        f"   Projetos de teste: {len(projetos_teste)}",
+        f"   SDKs instalados: {len(sdks_instalados)}",
+        f"   SDKs OK: {'Sim' if sdks_ok else 'Não'}",
+        f"   ReportGenerator: {'Instalado' if reportgenerator_instalado else 'Não instalado'}",
+        f"   Coverlet: {'OK' if coverlet_ok else f'{len(projetos_sem_coverlet)} projeto(s) sem Coverlet'}"
+    ]))
+    
+    atualizacoes.update({
         "sdks_instalados": sdks_instalados,
         "frameworks_necessarios": frameworks_necessarios,
         "sdks_ok": sdks_ok,
         "reportgenerator_instalado": reportgenerator_instalado,
         "coverlet_ok": coverlet_ok,
         "tipos_coverlet": tipos_coverlet,
-        "historico": historico,
+        "tabela_projetos_teste": TabelaProjetosTeste.criar(projetos_teste, tipos_coverlet),
         "validacoes_concluidas": True
+    })
+    
+    return atualizacoes
+
+
+def no_validar_ambiente(estado: EstadoAgente) -> Dict[str, Any]:
+    """
+    Nó: Valida o ambiente (primeira etapa - sem LLM).
+    Valida repositório Git, SDKs, ReportGenerator, Coverlet, etc.
+    
+    Versão síncrona de `no_validar_ambiente_async` (a registrada no grafo),
+    para chamadas fora de um event loop.
+    
+    Args:
+        estado: Estado atual do agente
+    
+    Returns:
+        Atualizações para o estado
+    """
+    return asyncio.run(no_validar_ambiente_async(estado))
+
+
+async def no_validar_ambiente_async(estado: EstadoAgente) -> Dict[str, Any]:
+    """
+    Nó (assíncrono): Valida o ambiente executando as sondagens concorrentemente.
+    
+    Args:
+        estado: Estado atual do agente
+    
+    Returns:
+        Atualizações para o estado
+    """
+    imprimir_cabecalho("ETAPA 1: VALIDAÇÃO DO AMBIENTE")
+    
+    caminho_projeto = estado.get("caminho_projeto")
+    if not caminho_projeto:
+        return {
+            "erros": ["Caminho do projeto não fornecido"],
+            "validacoes_concluidas": False
+        }
+    
+    # Resolve o caminho uma única vez (e o guarda no estado para os próximos nós);
+    # as sondagens recebem o caminho absoluto
+    caminho_projeto_path = estado.get("caminho_projeto_path") or Path(caminho_projeto).resolve(strict=False)
+    
+    log.info("\n📋 Validando repositório Git e ferramentas .NET...")
+    sondagem = await _sondar_ambiente_async(caminho_projeto_path)
+    
+    # Sem cache, a conclusão ainda lê e analisa os .csproj (projetos de teste,
+    # frameworks, Coverlet); roda em thread para não bloquear o event loop
+    return await asyncio.to_thread(
+        _concluir_validacao_ambiente, caminho_projeto_path, sondagem
+    )
+
+
+# Análises de código já feitas, por hash do conteúdo (LRU): o código fonte
+# raramente muda entre as iterações do loop e a análise é pura
+MAX_CACHE_ANALISE = 256
+_cache_analise: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+
+
+def _chave_codigo(codigo_fonte: str) -> bytes:
+    """Hash compacto (16 bytes) do código fonte, usado como chave do cache."""
+    return hashlib.blake2b(codigo_fonte.encode('utf-8'), digest_size=16).digest()
+
+
+def _analise_em_cache(chave: bytes) -> Optional[Dict[str, Any]]:
+    """Retorna a análise cacheada (marcando-a como recente) ou None."""
+    analise = _cache_analise.get(chave)
+    if analise is not None:
+        _cache_analise.move_to_end(chave)
+    return analise
+
+
+def _guardar_analise(chave: bytes, analise: Dict[str, Any]) -> None:
+    """Guarda a análise no cache, descartando a menos recente se cheio."""
+    _cache_analise[chave] = analise
+    if len(_cache_analise) > MAX_CACHE_ANALISE:
+        _cache_analise.popitem(last=False)
+
+
+def _resultado_analise(analise: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Registra o resultado da análise de código no histórico.
+    
+    Args:
+        analise: Resultado de `analisar_estrutura_codigo`
+    
+    Returns:
+        Atualizações para o estado
+    """
+    log.info(f"✅ Encontradas {len(analise.get('classes', []))} classes e {len(analise.get('metodos', []))} métodos")
+    
+    return {
+        "historico": [AcaoHistorico("analisar_codigo", {"resultado": analise})]
     }
 
 
@@ -249,34 +477,72 @@ def no_analisar_codigo(estado: EstadoAgente) -> Dict[str, Any]:
     """
     Nó: Analisa o código fonte e identifica o que precisa de testes.
     
+    Versão síncrona de `no_analisar_codigo_async` (a registrada no grafo),
+    para chamadas fora de um event loop.
+    
+    Args:
+        estado: Estado atual do agente
+    
+    Returns:
+        Atualizações para o estado
+    """
+    return asyncio.run(no_analisar_codigo_async(estado))
+
+
+async def no_analisar_codigo_async(estado: EstadoAgente) -> Dict[str, Any]:
+    """
+    Nó (assíncrono): Analisa o código fonte e identifica o que precisa de testes.
+    
     Args:
         estado: Estado atual do agente
     
     Returns:
         Atualizações para o estado
     """
-    print("🔍 Analisando estrutura do código...")
+    log.info("🔍 Analisando estrutura do código...")
     
     codigo_fonte = estado.get("codigo_fonte", "")
     if not codigo_fonte:
         return {
-            "erros": estado.get("erros", []) + ["Código fonte não fornecido"]
+            "erros": ["Código fonte não fornecido"]
         }
     
-    # Usa a ferramenta para analisar o código
-    analise = analisar_estrutura_codigo.invoke({"codigo": codigo_fonte})
+    chave = _chave_codigo(codigo_fonte)
+    analise = _analise_em_cache(chave)
+    if analise is None:
+        analise = await analisar_estrutura_codigo.ainvoke({"codigo": codigo_fonte})
+        _guardar_analise(chave, analise)
     
-    # Adiciona ao histórico
-    historico = estado.get("historico", [])
-    historico.append({
-        "acao": "analisar_codigo",
-        "resultado": analise
-    })
+    return _resultado_analise(analise)
+
+
+def _resultado_geracao(
+    iteracao: int,
+    teste_gerado: Optional[str],
+    validacao: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Registra o teste gerado (ou a falha) no estado.
     
-    print(f"✅ Encontradas {len(analise.get('classes', []))} classes e {len(analise.get('metodos', []))} métodos")
+    Args:
+        iteracao: Iteração em que o teste foi gerado
+        teste_gerado: Código do teste ou None em caso de falha
+        validacao: Validação do teste já limpo, feita na geração (opcional)
+    
+    Returns:
+        Atualizações para o estado
+    """
+    if not teste_gerado:
+        return {
+            "erros": ["Falha ao gerar teste"]
+        }
+    
+    log.info("✅ Teste gerado com sucesso")
     
     return {
-        "historico": historico
+        "testes_gerados": [teste_gerado],
+        "validacao_ultimo_teste": validacao,
+        "historico": [AcaoHistorico("gerar_testes", {"iteracao": iteracao, "teste_gerado": True})]
     }
 
 
@@ -284,13 +550,30 @@ def no_gerar_testes(estado: EstadoAgente) -> Dict[str, Any]:
     """
     Nó: Gera testes unitários usando o LLM.
     
+    Versão síncrona de `no_gerar_testes_async` (a registrada no grafo),
+    para chamadas fora de um event loop.
+    
+    Args:
+        estado: Estado atual do agente
+    
+    Returns:
+        Atualizações para o estado
+    """
+    return asyncio.run(no_gerar_testes_async(estado))
+
+
+async def no_gerar_testes_async(estado: EstadoAgente) -> Dict[str, Any]:
+    """
+    Nó (assíncrono): Gera testes unitários usando o LLM sem bloquear o event loop.
+    A resposta é consumida em streaming; o teste limpo é validado ao final.
+    
     Args:
         estado: Estado atual do agente
     
     Returns:
         Atualizações para o estado
     """
-    print("🤖 Gerando testes unitários...")
+    log.info("🤖 Gerando testes unitários...")
     
     codigo_fonte = estado.get("codigo_fonte", "")
     testes_existentes = estado.get("testes_existentes", "")
@@ -298,44 +581,28 @@ def no_gerar_testes(estado: EstadoAgente) -> Dict[str, Any]:
     
     if not codigo_fonte:
         return {
-            "erros": estado.get("erros", []) + ["Código fonte não fornecido para geração de testes"]
+            "erros": ["Código fonte não fornecido para geração de testes"]
         }
     
     try:
-        gerador = GeradorTestes()
-        teste_gerado = gerador.gerar_teste(
+        gerador = _gerador()
+        teste_gerado = await gerador.agerar_teste(
             codigo_fonte=codigo_fonte,
             testes_existentes=testes_existentes,
             iteracao=iteracao
         )
         
-        if teste_gerado:
-            testes_gerados = estado.get("testes_gerados", [])
-            testes_gerados.append(teste_gerado)
-            
-            historico = estado.get("historico", [])
-            historico.append({
-                "acao": "gerar_testes",
-                "iteracao": iteracao,
-                "teste_gerado": True
-            })
-            
-            print("✅ Teste gerado com sucesso")
-            
-            return {
-                "testes_gerados": testes_gerados,
-                "historico": historico
-            }
-        else:
-            return {
-                "erros": estado.get("erros", []) + ["Falha ao gerar teste"]
-            }
+        # Valida o código já limpo (sem markdown nem texto em volta), que é o
+        # teste guardado: `validar_testes` reaproveita este resultado
+        validacao = validar_codigo_teste.invoke({"codigo_teste": teste_gerado}) if teste_gerado else None
+        
+        return _resultado_geracao(iteracao, teste_gerado, validacao)
     
     except Exception as e:
         mensagem_erro = f"Erro ao gerar testes: {str(e)}"
-        print(f"❌ {mensagem_erro}")
+        log.error(f"❌ {mensagem_erro}")
         return {
-            "erros": estado.get("erros", []) + [mensagem_erro]
+            "erros": [mensagem_erro]
         }
 
 
@@ -349,39 +616,40 @@ def no_validar_testes(estado: EstadoAgente) -> Dict[str, Any]:
     Returns:
         Atualizações para o estado
     """
-    print("✔️  Validando testes gerados...")
+    log.info("✔️  Validando testes gerados...")
     
     testes_gerados = estado.get("testes_gerados", [])
     if not testes_gerados:
         return {
-            "erros": estado.get("erros", []) + ["Nenhum teste gerado para validar"]
+            "erros": ["Nenhum teste gerado para validar"]
         }
     
-    # Valida o último teste gerado
-    ultimo_teste = testes_gerados[-1]
-    validacao = validar_codigo_teste.invoke({"codigo_teste": ultimo_teste})
+    # Valida o último teste gerado (reaproveita a validação feita na geração)
+    validacao = estado.get("validacao_ultimo_teste")
+    if validacao is None:
+        ultimo_teste = testes_gerados[-1]
+        validacao = validar_codigo_teste.invoke({"codigo_teste": ultimo_teste})
     
-    historico = estado.get("historico", [])
-    historico.append({
-        "acao": "validar_testes",
+    entrada_historico = AcaoHistorico("validar_testes", {
         "eh_valido": validacao.get("eh_valido", False),
         "erros": validacao.get("erros", [])
     })
     
     if validacao.get("eh_valido"):
-        print("✅ Testes validados com sucesso")
+        log.info("✅ Testes validados com sucesso")
     else:
         erros = validacao.get("erros", [])
-        print(f"⚠️  Testes com problemas: {', '.join(erros)}")
+        log.warning(f"⚠️  Testes com problemas: {', '.join(erros)}")
     
     return {
-        "historico": historico
+        "historico": [entrada_historico]
     }
 
 
 def no_verificar_cobertura(estado: EstadoAgente) -> Dict[str, Any]:
     """
     Nó: Verifica a cobertura atual e decide se continua ou termina.
+    Quando decide continuar, já incrementa o contador de iterações.
     
     Args:
         estado: Estado atual do agente
@@ -389,34 +657,34 @@ def no_verificar_cobertura(estado: EstadoAgente) -> Dict[str, Any]:
     Returns:
         Atualizações para o estado e decisão de continuação
     """
-    print("📊 Verificando cobertura...")
+    log.info("📊 Verificando cobertura...")
     
     cobertura = estado.get("percentual_cobertura", 0.0)
     meta = estado.get("meta_cobertura", 80.0)
     iteracao = estado.get("iteracao", 0)
     max_iteracoes = estado.get("max_iteracoes", 5)
     
-    historico = estado.get("historico", [])
-    historico.append({
-        "acao": "verificar_cobertura",
+    entrada_historico = AcaoHistorico("verificar_cobertura", {
         "cobertura_atual": cobertura,
         "meta_cobertura": meta,
         "iteracao": iteracao
     })
     
-    print(f"📈 Cobertura atual: {cobertura:.1f}% | Meta: {meta:.1f}%")
+    log.info(f"📈 Cobertura atual: {cobertura:.1f}% | Meta: {meta:.1f}%")
     
     # Verifica se atingiu a meta ou excedeu iterações
     deve_continuar = cobertura < meta and iteracao < max_iteracoes
     
     if cobertura >= meta:
-        print(f"🎉 Meta de cobertura atingida! ({cobertura:.1f}% >= {meta:.1f}%)")
+        log.info(f"🎉 Meta de cobertura atingida! ({cobertura:.1f}% >= {meta:.1f}%)")
     elif iteracao >= max_iteracoes:
-        print(f"⚠️  Número máximo de iterações atingido ({max_iteracoes})")
+        log.warning(f"⚠️  Número máximo de iterações atingido ({max_iteracoes})")
     
     return {
-        "historico": historico,
-        "deve_continuar": deve_continuar
+        "historico": [entrada_historico],
+        "deve_continuar": deve_continuar,
+        # Avança a iteração aqui mesmo quando o loop continua (sem nó extra)
+        "iteracao": iteracao + 1 if deve_continuar else iteracao
     }
 
 
@@ -430,81 +698,115 @@ def no_executar_cobertura(estado: EstadoAgente) -> Dict[str, Any]:
     Returns:
         Atualizações para o estado
     """
+    from src.validacao.cobertura import (
+        executar_testes_com_cobertura_paralelo,
+        mesclar_arquivos_cobertura,
+        gerar_saidas_cobertura,
+        gerar_relatorio_html,
+        filtrar_e_resumir_cobertura,
+        extrair_resumo_cobertura
+    )
+    
     imprimir_cabecalho("EXECUÇÃO DE COBERTURA")
     
+    # Atalho: se o diff não tem nenhum arquivo C#, não há código de produção
+    # modificado para cobrir. `modo == "full"` (COVERAGE_MODE=full) força a execução.
+    if (
+        estado.get("modo", "diff") != "full"
+        and estado.get("branch_base")
+        and not estado.get("arquivos_cs_modificados")
+    ):
+        log.info("⏭️  Nenhum arquivo C# no diff: execução de cobertura ignorada (use COVERAGE_MODE=full para forçar)")
+        return {
+            "resumo_cobertura": {"line_coverage": 100.0, "lines_covered": 0, "lines_valid": 0},
+            "percentual_cobertura": 100.0,
+            "historico": [AcaoHistorico("executar_cobertura", {"ignorado": "sem_diff_cs"})]
+        }
+    
     caminho_projeto = estado.get("caminho_projeto")
-    projetos_teste = estado.get("projetos_teste", [])
-    tipos_coverlet = estado.get("tipos_coverlet", {})
+    # Tabela montada na validação; sem ela, monta a partir da lista e do dict
+    tabela = estado.get("tabela_projetos_teste") or TabelaProjetosTeste.criar(
+        estado.get("projetos_teste", []),
+        estado.get("tipos_coverlet", {})
+    )
+    projetos_teste = tabela.caminhos
     arquivos_modificados = estado.get("arquivos_modificados", {})
     
     if not caminho_projeto:
-        return {"erros": estado.get("erros", []) + ["Caminho do projeto não fornecido"]}
+        return {"erros": ["Caminho do projeto não fornecido"]}
     
     if not projetos_teste:
-        return {"erros": estado.get("erros", []) + ["Nenhum projeto de teste encontrado"]}
+        return {"erros": ["Nenhum projeto de teste encontrado"]}
     
-    caminho_projeto_path = Path(caminho_projeto)
+    caminho_projeto_path = estado.get("caminho_projeto_path") or Path(caminho_projeto)
     diretorio_cobertura = caminho_projeto_path / ".coverage-reports"
     
-    # 1. Executa testes com cobertura para cada projeto
-    print("\n🧪 Executando testes com cobertura...")
-    arquivos_cobertura = []
+    # 1. Executa testes com cobertura para cada projeto: builds em sequência e
+    # `dotnet test` em paralelo, cada projeto gravando em arquivos distintos
+    log.info("\n🧪 Executando testes com cobertura...")
+    diretorio_cobertura.mkdir(parents=True, exist_ok=True)
     
-    for projeto_str in projetos_teste:
-        projeto = Path(projeto_str)
-        tipo_coverlet = tipos_coverlet.get(projeto_str, 'collector')
-        
-        arquivo_cob = executar_testes_com_cobertura(
-            projeto,
-            tipo_coverlet,
-            diretorio_cobertura
+    # Mantém a ordem dos projetos para que a mesclagem seja determinística
+    arquivos_cobertura = [
+        arquivo
+        for arquivo in executar_testes_com_cobertura_paralelo(
+            projetos_teste, tabela.tipos_coverlet, diretorio_cobertura
         )
-        
-        if arquivo_cob:
-            arquivos_cobertura.append(arquivo_cob)
+        if arquivo
+    ]
     
     if not arquivos_cobertura:
         return {
-            "erros": estado.get("erros", []) + ["Nenhum arquivo de cobertura foi gerado"],
+            "erros": ["Nenhum arquivo de cobertura foi gerado"],
             "arquivos_cobertura": []
         }
     
-    print(f"\n✅ {len(arquivos_cobertura)} arquivo(s) de cobertura gerado(s)")
+    log.info(f"\n✅ {len(arquivos_cobertura)} arquivo(s) de cobertura gerado(s)")
     
-    # 2. Mescla arquivos de cobertura
-    print("\n📊 Mesclando arquivos de cobertura...")
+    # 2 e 3. Mescla os arquivos de cobertura e gera o relatório HTML geral em
+    # uma única execução do ReportGenerator
     arquivo_mesclado = diretorio_cobertura / "coverage_merged.cobertura.xml"
-    
-    if mesclar_arquivos_cobertura(arquivos_cobertura, arquivo_mesclado):
-        print(f"✅ Arquivo mesclado: {arquivo_mesclado.name}")
-    else:
-        arquivo_mesclado = None
-    
-    # 3. Gera relatório HTML geral
-    print("\n📄 Gerando relatório HTML geral...")
     relatorio_geral = diretorio_cobertura / "html-report"
-    relatorio_html_ok = False
     
-    if arquivo_mesclado and arquivo_mesclado.exists():
-        relatorio_html_ok = gerar_relatorio_html(
+    if estado.get("reportgenerator_instalado"):
+        log.info("\n📊 Mesclando arquivos de cobertura e gerando relatório HTML geral...")
+        mesclado_ok, relatorio_html_ok = gerar_saidas_cobertura(
+            arquivos_cobertura,
             arquivo_mesclado,
             relatorio_geral,
             "Relatório de Cobertura Geral"
         )
+    else:
+        # Sem ReportGenerator não há HTML; com um único arquivo de cobertura a
+        # mesclagem é uma cópia, e o filtro por diff e o resumo seguem funcionando
+        log.warning("\n⚠️  ReportGenerator não instalado: relatórios HTML não serão gerados")
+        log.info("\n📊 Mesclando arquivos de cobertura...")
+        mesclado_ok = mesclar_arquivos_cobertura(arquivos_cobertura, arquivo_mesclado)
+        relatorio_html_ok = False
+    if mesclado_ok:
+        log.info(f"✅ Arquivo mesclado: {arquivo_mesclado.name}")
+    else:
+        arquivo_mesclado = None
     
-    # 4. Filtra cobertura por diff (se houver arquivos modificados)
+    # 4. Filtra cobertura por diff (se houver arquivos modificados); a mesma
+    # leitura do arquivo mesclado já extrai o resumo usado no passo 6
     arquivo_diff = None
     relatorio_diff = None
+    resumo = None
     
-    if arquivos_modificados and arquivo_mesclado and arquivo_mesclado.exists():
-        print("\n🔍 Filtrando cobertura por diff...")
+    if arquivos_modificados and mesclado_ok:
+        log.info("\n🔍 Filtrando cobertura por diff...")
         arquivo_diff = diretorio_cobertura / "coverage_diff.cobertura.xml"
         
-        if filtrar_cobertura_por_diff(arquivo_mesclado, arquivos_modificados, arquivo_diff):
-            print(f"✅ Cobertura filtrada: {arquivo_diff.name}")
-            
+        filtragem_ok, resumo = filtrar_e_resumir_cobertura(
+            arquivo_mesclado, arquivos_modificados, arquivo_diff
+        )
+        if filtragem_ok:
+            log.info(f"✅ Cobertura filtrada: {arquivo_diff.name}")
+        
+        if filtragem_ok and estado.get("reportgenerator_instalado"):
             # 5. Gera relatório HTML do diff
-            print("\n📄 Gerando relatório HTML do diff...")
+            log.info("\n📄 Gerando relatório HTML do diff...")
             relatorio_diff = diretorio_cobertura / "html-report-diff"
             
             gerar_relatorio_html(
@@ -515,32 +817,32 @@ def no_executar_cobertura(estado: EstadoAgente) -> Dict[str, Any]:
     
     # 6. Extrai resumo de cobertura
     resumo_cobertura = {}
-    if arquivo_mesclado and arquivo_mesclado.exists():
+    if resumo is None and mesclado_ok:
         resumo = extrair_resumo_cobertura(arquivo_mesclado)
-        if resumo:
-            resumo_cobertura = resumo
-            print(f"\n📊 Resumo de Cobertura:")
-            print(f"   Cobertura de linhas: {resumo['line_coverage']:.2f}%")
-            print(f"   Linhas cobertas: {resumo['lines_covered']}/{resumo['lines_valid']}")
-    
-    # Atualiza histórico
-    historico = estado.get("historico", [])
-    historico.append({
-        "acao": "executar_cobertura",
+    if resumo:
+        resumo_cobertura = resumo
+        log.info(f"\n📊 Resumo de Cobertura:")
+        log.info(f"   Cobertura de linhas: {resumo['line_coverage']:.2f}%")
+        log.info(f"   Linhas cobertas: {resumo['lines_covered']}/{resumo['lines_valid']}")
+    
+    # Entrada do histórico (o canal acumula via reducer)
+    entrada_historico = AcaoHistorico("executar_cobertura", {
         "arquivos_gerados": len(arquivos_cobertura),
         "relatorio_html": relatorio_html_ok,
         "cobertura_percentual": resumo_cobertura.get('line_coverage', 0.0)
     })
     
+    relatorio_diff_existe = relatorio_diff is not None and relatorio_diff.exists()
+    
     return {
         "arquivos_cobertura": [str(f) for f in arquivos_cobertura],
         "arquivo_cobertura_mesclado": str(arquivo_mesclado) if arquivo_mesclado else None,
         "arquivo_cobertura_diff": str(arquivo_diff) if arquivo_diff else None,
         "relatorio_html_geral": str(relatorio_geral / "index.html") if relatorio_html_ok else None,
-        "relatorio_html_diff": str(relatorio_diff / "index.html") if relatorio_diff and relatorio_diff.exists() else None,
+        "relatorio_html_diff": str(relatorio_diff / "index.html") if relatorio_diff_existe else None,
         "resumo_cobertura": resumo_cobertura,
         "percentual_cobertura": resumo_cobertura.get('line_coverage', 0.0),
-        "historico": historico
+        "historico": [entrada_historico]
     }
 
 
@@ -1,44 +1,104 @@
 """Definição do estado do agente."""
 
-from typing import TypedDict, List, Dict, Optional, Any, Set
+import operator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple, Annotated, NamedTuple
 
 
-class EstadoAgente(TypedDict):
+class AcaoHistorico(NamedTuple):
+    """
+    Entrada do histórico: a ação executada por um nó e seus dados.
+    
+    Tupla nomeada (sem tabela de hash por entrada, como um dict teria);
+    `para_dict` devolve o formato plano `{"acao": ..., **dados}`.
+    
+    Atributos:
+        acao: Nome da ação (ex: 'validar_ambiente', 'gerar_testes')
+        dados: Dados específicos da ação
+    """
+    acao: str
+    dados: Dict[str, Any]
+    
+    def para_dict(self) -> Dict[str, Any]:
+        """Converte a entrada para um dict plano."""
+        return {"acao": self.acao, **self.dados}
+
+
+@dataclass(slots=True)
+class TabelaProjetosTeste:
+    """
+    Projetos de teste em colunas paralelas (struct-of-arrays).
+    
+    A posição `i` de cada lista descreve o mesmo projeto; o tipo de Coverlet
+    é resolvido uma vez na validação, sem lookups por caminho depois.
+    
+    Atributos:
+        caminhos: Caminhos dos projetos de teste
+        tipos_coverlet: Tipo de Coverlet de cada projeto ('collector'/'msbuild')
+    """
+    caminhos: List[Path] = field(default_factory=list)
+    tipos_coverlet: List[str] = field(default_factory=list)
+    
+    @classmethod
+    def criar(cls, projetos_teste: List[Path], tipos_coverlet: Dict[str, str]) -> "TabelaProjetosTeste":
+        """Monta a tabela a partir da lista de projetos e do dict {projeto: tipo}."""
+        return cls(
+            caminhos=list(projetos_teste),
+            tipos_coverlet=[tipos_coverlet.get(str(projeto), 'collector') for projeto in projetos_teste]
+        )
+
+
+@dataclass(slots=True)
+class EstadoAgente:
     """
     Estado compartilhado do agente durante a execução.
     
+    Dataclass com slots: os campos ficam em posições fixas (sem `__dict__`
+    por instância). Os métodos `get`/`__getitem__`/`__setitem__` mantêm a
+    interface de dicionário usada pelos nós; os defaults espelham os usados
+    nas chamadas `estado.get(...)`.
+    
+    Campos grandes que só são lidos depois da validação (diff, .csproj,
+    projetos de teste, SDKs) são tuplas imutáveis: passam de um estado para
+    o próximo por referência, sem cópia.
+    
     Atributos:
         codigo_fonte: Código fonte C# a ser testado
         testes_existentes: Testes unitários existentes
-        testes_gerados: Testes gerados pelo agente
+        testes_gerados: Testes gerados pelo agente (acumulado)
+        validacao_ultimo_teste: Validação do último teste, feita já na geração
         percentual_cobertura: Percentual de cobertura atual
         meta_cobertura: Meta de cobertura desejada
         iteracao: Número da iteração atual
         max_iteracoes: Número máximo de iterações permitidas
-        historico: Histórico de ações e resultados
-        erros: Lista de erros encontrados
+        historico: Histórico de ações e resultados (acumulado, entradas `AcaoHistorico`)
+        erros: Lista de erros encontrados (acumulado)
         caminho_arquivo: Caminho do arquivo sendo processado
         caminho_projeto: Caminho do projeto .NET
+        caminho_projeto_path: Caminho do projeto já resolvido (Path), preenchido na validação
         deve_continuar: Flag indicando se deve continuar o loop
+        modo: "diff" (padrão) pula a cobertura se o diff não tiver arquivos .cs; "full" sempre executa
         # Validações da primeira etapa
         eh_repositorio_git: Flag indicando se é repositório Git válido
         branch_base: Branch base para comparação
         branch_atual: Branch atual do repositório
         validacoes_concluidas: Flag indicando se validações foram concluídas
         # Análise de diff Git
-        arquivos_modificados: Dicionário mapeando arquivos para linhas modificadas
+        arquivos_modificados: Dicionário mapeando arquivos para tuplas imutáveis de intervalos (inicio, fim)
         total_linhas_modificadas: Total de linhas modificadas no diff
-        arquivos_cs_modificados: Lista de arquivos C# (.cs) modificados
+        arquivos_cs_modificados: Tupla de arquivos C# (.cs) modificados
         # Descoberta de projetos .NET
-        arquivos_csproj: Lista de caminhos para arquivos .csproj encontrados
-        projetos_teste: Lista de projetos de teste identificados
+        arquivos_csproj: Tupla de caminhos (Path) para arquivos .csproj encontrados
+        projetos_teste: Tupla de caminhos (Path) dos projetos de teste identificados
         dotnet_instalado: Flag indicando se .NET SDK está instalado
-        sdks_instalados: Lista de versões de SDKs instalados
-        frameworks_necessarios: Set de frameworks necessários pelos projetos
+        sdks_instalados: Tupla de versões de SDKs instalados
+        frameworks_necessarios: Tupla ordenada de frameworks necessários pelos projetos
         sdks_ok: Flag indicando se todos os SDKs necessários estão disponíveis
         reportgenerator_instalado: Flag indicando se ReportGenerator está instalado
         coverlet_ok: Flag indicando se todos os projetos de teste têm Coverlet
         tipos_coverlet: Dict mapeando projetos para tipo de Coverlet (collector/msbuild)
+        tabela_projetos_teste: Projetos de teste e tipos de Coverlet em colunas paralelas
         # Cobertura de código
         arquivos_cobertura: Lista de arquivos de cobertura gerados
         arquivo_cobertura_mesclado: Caminho para arquivo de cobertura mesclado
@@ -47,44 +107,67 @@ class EstadoAgente(TypedDict):
         relatorio_html_diff: Caminho para relatório HTML do diff
         resumo_cobertura: Dict com métricas de cobertura
     """
-    codigo_fonte: str
-    testes_existentes: str
-    testes_gerados: List[str]
-    percentual_cobertura: float
-    meta_cobertura: float
-    iteracao: int
-    max_iteracoes: int
-    historico: List[Dict[str, Any]]
-    erros: List[str]
-    caminho_arquivo: Optional[str]
-    caminho_projeto: Optional[str]
-    deve_continuar: bool
+    codigo_fonte: str = ""
+    testes_existentes: str = ""
+    # Canais acumulados: os nós retornam apenas as novas entradas e o
+    # reducer `operator.add` as concatena ao valor atual (sem copiar a lista
+    # a cada nó). Nunca devolva a lista do estado com itens adicionados:
+    # ela seria concatenada a si mesma, duplicando as entradas.
+    testes_gerados: Annotated[List[str], operator.add] = field(default_factory=list)
+    validacao_ultimo_teste: Optional[Dict[str, Any]] = None
+    percentual_cobertura: float = 0.0
+    meta_cobertura: float = 80.0
+    iteracao: int = 0
+    max_iteracoes: int = 5
+    historico: Annotated[List[AcaoHistorico], operator.add] = field(default_factory=list)
+    erros: Annotated[List[str], operator.add] = field(default_factory=list)
+    caminho_arquivo: Optional[str] = None
+    caminho_projeto: Optional[str] = None
+    caminho_projeto_path: Optional[Path] = None  # Path resolvido uma vez, reaproveitado pelos nós
+    deve_continuar: bool = False
+    modo: str = "diff"  # "diff" ou "full"
     # Validações da primeira etapa
-    eh_repositorio_git: bool
-    branch_base: Optional[str]
-    branch_atual: Optional[str]
-    validacoes_concluidas: bool
+    eh_repositorio_git: bool = False
+    branch_base: Optional[str] = None
+    branch_atual: Optional[str] = None
+    validacoes_concluidas: bool = False
     # Análise de diff Git
-    arquivos_modificados: Dict[str, Set[int]]  # {arquivo: {linhas modificadas}}
-    total_linhas_modificadas: int
-    arquivos_cs_modificados: List[str]  # Lista de arquivos .cs modificados
+    arquivos_modificados: Dict[str, Tuple[Tuple[int, int], ...]] = field(default_factory=dict)  # {arquivo: ((inicio, fim), ...) ordenados, imutáveis}
+    total_linhas_modificadas: int = 0
+    arquivos_cs_modificados: Tuple[str, ...] = ()  # Arquivos .cs modificados
     # Descoberta de projetos .NET
-    arquivos_csproj: List[str]  # Caminhos para arquivos .csproj (como strings)
-    projetos_teste: List[str]  # Caminhos para projetos de teste
-    dotnet_instalado: bool
-    sdks_instalados: List[str]  # Versões de SDKs instalados
-    frameworks_necessarios: Set[str]  # Frameworks necessários (ex: 'net8.0')
-    sdks_ok: bool  # Todos os SDKs necessários estão instalados
-    reportgenerator_instalado: bool  # ReportGenerator está instalado
-    coverlet_ok: bool  # Todos os projetos de teste têm Coverlet
-    tipos_coverlet: Dict[str, str]  # {projeto: tipo_coverlet}
+    arquivos_csproj: Tuple[Path, ...] = ()  # Caminhos para arquivos .csproj
+    projetos_teste: Tuple[Path, ...] = ()  # Caminhos para projetos de teste
+    dotnet_instalado: bool = False
+    sdks_instalados: Tuple[str, ...] = ()  # Versões de SDKs instalados
+    frameworks_necessarios: Tuple[str, ...] = ()  # Frameworks necessários (ex: 'net8.0')
+    sdks_ok: bool = False  # Todos os SDKs necessários estão instalados
+    reportgenerator_instalado: bool = False  # ReportGenerator está instalado
+    coverlet_ok: bool = False  # Todos os projetos de teste têm Coverlet
+    tipos_coverlet: Dict[str, str] = field(default_factory=dict)  # {projeto: tipo_coverlet}
+    tabela_projetos_teste: Optional[TabelaProjetosTeste] = None  # Projetos + tipo de Coverlet por posição
     # Cobertura de código
-    arquivos_cobertura: List[str]  # Arquivos de cobertura gerados
-    arquivo_cobertura_mesclado: Optional[str]  # Arquivo mesclado
-    arquivo_cobertura_diff: Optional[str]  # Arquivo filtrado por diff
-    relatorio_html_geral: Optional[str]  # Relatório HTML geral
-    relatorio_html_diff: Optional[str]  # Relatório HTML do diff
-    resumo_cobertura: Dict[str, Any]  # Métricas de cobertura
+    arquivos_cobertura: List[str] = field(default_factory=list)  # Arquivos de cobertura gerados
+    arquivo_cobertura_mesclado: Optional[str] = None  # Arquivo mesclado
+    arquivo_cobertura_diff: Optional[str] = None  # Arquivo filtrado por diff
+    relatorio_html_geral: Optional[str] = None  # Relatório HTML geral
+    relatorio_html_diff: Optional[str] = None  # Relatório HTML do diff
+    resumo_cobertura: Dict[str, Any] = field(default_factory=dict)  # Métricas de cobertura
+    
+    def get(self, chave: str, padrao: Any = None) -> Any:
+        """Acesso no estilo `dict.get`, para compatibilidade com os nós."""
+        return getattr(self, chave, padrao)
+    
+    def __getitem__(self, chave: str) -> Any:
+        try:
+            return getattr(self, chave)
+        except AttributeError:
+            raise KeyError(chave) from None
+    
+    def __setitem__(self, chave: str, valor: Any) -> None:
+        if chave not in self.__dataclass_fields__:
+            raise KeyError(chave)
+        setattr(self, chave, valor)
 
 # Alias para compatibilidade
 AgentState = EstadoAgente
@@ -54,7 +54,9 @@ def validar_codigo_teste(codigo_teste: str) -> Dict[str, Any]:
     Returns:
         Dicionário com resultado da validação
     """
-    # Validação básica - verifica estrutura mínima
+    # Validação básica - verifica estrutura mínima. Buscas de substring com
+    # `in` (em C, com curto-circuito no `or`): medido, bem mais rápido que
+    # uma alternância de regex equivalente
     tem_using = 'using ' in codigo_teste
     tem_classe_teste = '[Fact]' in codigo_teste or '[Test]' in codigo_teste or '[TestMethod]' in codigo_teste
     tem_metodo_teste = 'public void' in codigo_teste or 'public async Task' in codigo_teste
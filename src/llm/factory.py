@@ -17,11 +17,13 @@ def criar_llm(provedor: Optional[str] = None) -> Optional[BaseChatModel]:
     Returns:
         Instância do LLM configurada ou None se não configurado
     """
+    # Resolve o nome antes de consultar o cache, para que `None` e o valor
+    # de LLM_PROVIDER compartilhem a mesma instância
     if provedor is None:
         provedor = os.getenv("LLM_PROVIDER", "openai")
     
     try:
-        llm = obter_llm_para_provedor(provedor)
+        llm = obter_llm_para_provedor(provedor.strip())
         if llm is None:
             print(f"⚠️  Provedor '{provedor}' não está configurado corretamente.")
             print(f"   Verifique as variáveis de ambiente no arquivo .env")
@@ -1,15 +1,20 @@
 """Implementações dos providers de LLM."""
 
 import os
-from typing import Optional
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, NamedTuple, Optional
 from enum import Enum
 
-from langchain_openai import ChatOpenAI
-from langchain_anthropic import ChatAnthropic
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_community.chat_models import AzureChatOpenAI, ChatOllama, ChatOpenAI as ChatOpenAICommunity
 from langchain_core.language_models import BaseChatModel
 
+# Os SDKs dos provedores são importados dentro de cada criar_llm_*: só as
+# dependências do provedor efetivamente usado são carregadas
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
+    from langchain_anthropic import ChatAnthropic
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from langchain_community.chat_models import AzureChatOpenAI, ChatOllama
+
 
 class ProvedorLLM(str, Enum):
     """Enum dos provedores de LLM suportados."""
@@ -22,59 +27,75 @@ class ProvedorLLM(str, Enum):
     OPENROUTER = "openrouter"
 
 
-def criar_llm_openai() -> Optional[ChatOpenAI]:
+class ConfigLLM(NamedTuple):
+    """Configuração de um provedor lida das variáveis de ambiente."""
+    modelo: str
+    temperatura: float
+    max_tokens: int
+    chave_api: Optional[str]
+
+
+@lru_cache(maxsize=None)
+def _config_provedor(prefixo: str, modelo_padrao: str) -> ConfigLLM:
+    """
+    Lê e converte as variáveis <PREFIXO>_MODEL/_TEMPERATURE/_MAX_TOKENS/_API_KEY.
+    
+    O resultado é cacheado por provedor: o ambiente é consultado (e os valores
+    convertidos) apenas na primeira chamada.
+    """
+    return ConfigLLM(
+        modelo=os.getenv(f"{prefixo}_MODEL", modelo_padrao),
+        temperatura=float(os.getenv(f"{prefixo}_TEMPERATURE", "0.7")),
+        max_tokens=int(os.getenv(f"{prefixo}_MAX_TOKENS", "4000")),
+        chave_api=os.getenv(f"{prefixo}_API_KEY")
+    )
+
+
+def criar_llm_openai() -> Optional["ChatOpenAI"]:
     """Cria instância do LLM OpenAI."""
-    chave_api = os.getenv("OPENAI_API_KEY")
-    if not chave_api:
+    config = _config_provedor("OPENAI", "gpt-4o-mini")
+    if not config.chave_api:
         return None
     
-    modelo = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    temperatura = float(os.getenv("OPENAI_TEMPERATURE", "0.7"))
-    max_tokens = int(os.getenv("OPENAI_MAX_TOKENS", "4000"))
-    
+    from langchain_openai import ChatOpenAI
     return ChatOpenAI(
-        model=modelo,
-        temperature=temperatura,
-        max_tokens=max_tokens,
-        api_key=chave_api
+        model=config.modelo,
+        temperature=config.temperatura,
+        max_tokens=config.max_tokens,
+        api_key=config.chave_api
     )
 
 
-def criar_llm_anthropic() -> Optional[ChatAnthropic]:
+def criar_llm_anthropic() -> Optional["ChatAnthropic"]:
     """Cria instância do LLM Anthropic (Claude)."""
-    chave_api = os.getenv("ANTHROPIC_API_KEY")
-    if not chave_api:
+    config = _config_provedor("ANTHROPIC", "claude-3-5-sonnet-20241022")
+    if not config.chave_api:
         return None
     
-    modelo = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-20241022")
-    temperatura = float(os.getenv("ANTHROPIC_TEMPERATURE", "0.7"))
-    max_tokens = int(os.getenv("ANTHROPIC_MAX_TOKENS", "4000"))
-    
+    from langchain_anthropic import ChatAnthropic
     return ChatAnthropic(
-        model=modelo,
-        temperature=temperatura,
-        max_tokens=max_tokens,
-        api_key=chave_api
+        model=config.modelo,
+        temperature=config.temperatura,
+        max_tokens=config.max_tokens,
+        api_key=config.chave_api
     )
 
 
-def criar_llm_google() -> Optional[ChatGoogleGenerativeAI]:
+def criar_llm_google() -> Optional["ChatGoogleGenerativeAI"]:
     """Cria instância do LLM Google (Gemini)."""
-    chave_api = os.getenv("GOOGLE_API_KEY")
-    if not chave_api:
+    config = _config_provedor("GOOGLE", "gemini-1.5-pro")
+    if not config.chave_api:
         return None
     
-    modelo = os.getenv("GOOGLE_MODEL", "gemini-1.5-pro")
-    temperatura = float(os.getenv("GOOGLE_TEMPERATURE", "0.7"))
-    
+    from langchain_google_genai import ChatGoogleGenerativeAI
     return ChatGoogleGenerativeAI(
-        model=modelo,
-        temperature=temperatura,
-        google_api_key=chave_api
+        model=config.modelo,
+        temperature=config.temperatura,
+        google_api_key=config.chave_api
     )
 
 
-def criar_llm_azure() -> Optional[AzureChatOpenAI]:
+def criar_llm_azure() -> Optional["AzureChatOpenAI"]:
     """Cria instância do LLM Azure OpenAI."""
     chave_api = os.getenv("AZURE_OPENAI_API_KEY")
     endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
@@ -84,6 +105,7 @@ def criar_llm_azure() -> Optional[AzureChatOpenAI]:
     if not chave_api or not endpoint:
         return None
     
+    from langchain_community.chat_models import AzureChatOpenAI
     return AzureChatOpenAI(
         azure_endpoint=endpoint,
         azure_deployment=deployment,
@@ -93,55 +115,49 @@ def criar_llm_azure() -> Optional[AzureChatOpenAI]:
     )
 
 
-def criar_llm_ollama() -> Optional[ChatOllama]:
+def criar_llm_ollama() -> Optional["ChatOllama"]:
     """Cria instância do LLM Ollama (local)."""
     url_base = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
-    modelo = os.getenv("OLLAMA_MODEL", "llama3.2")
-    temperatura = float(os.getenv("OLLAMA_TEMPERATURE", "0.7"))
+    config = _config_provedor("OLLAMA", "llama3.2")
     
+    from langchain_community.chat_models import ChatOllama
     return ChatOllama(
         base_url=url_base,
-        model=modelo,
-        temperature=temperatura
+        model=config.modelo,
+        temperature=config.temperatura
     )
 
 
-def criar_llm_groq() -> Optional[ChatOpenAI]:
+def criar_llm_groq() -> Optional["ChatOpenAI"]:
     """Cria instância do LLM Groq."""
-    chave_api = os.getenv("GROQ_API_KEY")
-    if not chave_api:
+    config = _config_provedor("GROQ", "llama-3.1-70b-versatile")
+    if not config.chave_api:
         return None
     
-    modelo = os.getenv("GROQ_MODEL", "llama-3.1-70b-versatile")
-    temperatura = float(os.getenv("GROQ_TEMPERATURE", "0.7"))
-    max_tokens = int(os.getenv("GROQ_MAX_TOKENS", "4000"))
-    
+    from langchain_openai import ChatOpenAI
     # Groq usa a API OpenAI-compatible
     return ChatOpenAI(
-        model=modelo,
-        temperature=temperatura,
-        max_tokens=max_tokens,
-        api_key=chave_api,
+        model=config.modelo,
+        temperature=config.temperatura,
+        max_tokens=config.max_tokens,
+        api_key=config.chave_api,
         base_url="https://api.groq.com/openai/v1"
     )
 
 
-def criar_llm_openrouter() -> Optional[ChatOpenAI]:
+def criar_llm_openrouter() -> Optional["ChatOpenAI"]:
     """Cria instância do LLM OpenRouter."""
-    chave_api = os.getenv("OPENROUTER_API_KEY")
-    if not chave_api:
+    config = _config_provedor("OPENROUTER", "openai/gpt-4o-mini")
+    if not config.chave_api:
         return None
     
-    modelo = os.getenv("OPENROUTER_MODEL", "openai/gpt-4o-mini")
-    temperatura = float(os.getenv("OPENROUTER_TEMPERATURE", "0.7"))
-    max_tokens = int(os.getenv("OPENROUTER_MAX_TOKENS", "4000"))
-    
+    from langchain_openai import ChatOpenAI
     # OpenRouter usa a API OpenAI-compatible
     return ChatOpenAI(
-        model=modelo,
-        temperature=temperatura,
-        max_tokens=max_tokens,
-        api_key=chave_api,
+        model=config.modelo,
+        temperature=config.temperatura,
+        max_tokens=config.max_tokens,
+        api_key=config.chave_api,
         base_url="https://openrouter.ai/api/v1"
     )
 
@@ -150,27 +166,35 @@ def obter_llm_para_provedor(provedor: str) -> Optional[BaseChatModel]:
     """
     Retorna uma instância de LLM baseada no provedor especificado.
     
+    A instância é cacheada por provedor: chamadas repetidas devolvem o mesmo
+    cliente (e o mesmo pool de conexões HTTP). As variáveis de ambiente são
+    lidas apenas na primeira chamada de cada provedor.
+    
     Args:
         provedor: Nome do provedor (openai, anthropic, google, azure, ollama, groq, openrouter)
     
     Returns:
         Instância do LLM ou None se não configurado
     """
-    provedor_lower = provedor.lower()
-    
-    if provedor_lower == ProvedorLLM.OPENAI:
-        return criar_llm_openai()
-    elif provedor_lower == ProvedorLLM.ANTHROPIC:
-        return criar_llm_anthropic()
-    elif provedor_lower == ProvedorLLM.GOOGLE:
-        return criar_llm_google()
-    elif provedor_lower == ProvedorLLM.AZURE:
-        return criar_llm_azure()
-    elif provedor_lower == ProvedorLLM.OLLAMA:
-        return criar_llm_ollama()
-    elif provedor_lower == ProvedorLLM.GROQ:
-        return criar_llm_groq()
-    elif provedor_lower == ProvedorLLM.OPENROUTER:
-        return criar_llm_openrouter()
-    else:
-        raise ValueError(f"Provedor não suportado: {provedor}")
+    return _obter_llm_cacheado(provedor.lower())
+
+
+# Fábrica de cada provedor (chaves iguais aos valores de ProvedorLLM)
+_FABRICAS: Dict[str, Callable[[], Optional[BaseChatModel]]] = {
+    ProvedorLLM.OPENAI.value: criar_llm_openai,
+    ProvedorLLM.ANTHROPIC.value: criar_llm_anthropic,
+    ProvedorLLM.GOOGLE.value: criar_llm_google,
+    ProvedorLLM.AZURE.value: criar_llm_azure,
+    ProvedorLLM.OLLAMA.value: criar_llm_ollama,
+    ProvedorLLM.GROQ.value: criar_llm_groq,
+    ProvedorLLM.OPENROUTER.value: criar_llm_openrouter,
+}
+
+
+@lru_cache(maxsize=8)
+def _obter_llm_cacheado(provedor_lower: str) -> Optional[BaseChatModel]:
+    """Cria o LLM do provedor (nome já normalizado); o resultado é cacheado."""
+    fabrica = _FABRICAS.get(provedor_lower)
+    if fabrica is None:
+        raise ValueError(f"Provedor não suportado: {provedor_lower}")
+    return fabrica()
@@ -1,28 +1,24 @@
 """Gerador de testes unitários usando LLM."""
 
-from typing import Optional
+import hashlib
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 
 from src.llm.factory import criar_llm
 from src.test_generator.parser import ParserCodigo
+from src.validacao.cache import carregar_teste_cache, salvar_teste_cache
 
 
-class GeradorTestes:
-    """Gerador de testes unitários para código C#."""
-    
-    def __init__(self):
-        """Inicializa o gerador com o LLM configurado."""
-        self.llm = criar_llm()
-        self.parser = ParserCodigo()
-        
-        if not self.llm:
-            raise ValueError("LLM não configurado. Verifique o arquivo .env")
-    
-    def _criar_template_prompt(self) -> ChatPromptTemplate:
-        """Cria o template de prompt para geração de testes."""
-        return ChatPromptTemplate.from_messages([
-            ("system", """Você é um especialista em testes unitários para C# (.NET).
+# Cerca de bloco de código markdown e as linguagens removidas junto com ela
+_CERCA = "```"
+_LINGUAGENS_CERCA = ("csharp", "cs")
+
+# Template de prompt para geração de testes: só depende de texto fixo, então
+# é montado uma vez na importação e compartilhado por todos os geradores
+_PROMPT_GERACAO = ChatPromptTemplate.from_messages([
+    ("system", """Você é um especialista em testes unitários para C# (.NET).
 Sua tarefa é gerar testes unitários de alta qualidade usando xUnit, NUnit ou MSTest.
 
 Diretrizes:
@@ -40,7 +36,7 @@ Formato esperado:
 - Classe de teste com sufixo 'Tests'
 - Métodos de teste com atributos [Fact] ou [Theory]
 """),
-            ("human", """Gere testes unitários para o seguinte código C#:
+    ("human", """Gere testes unitários para o seguinte código C#:
 
 CÓDIGO FONTE:
 {source_code}
@@ -57,7 +53,86 @@ Gere testes que cubram:
 - Diferentes cenários de uso
 
 Retorne APENAS o código C# completo e válido, sem explicações adicionais.""")
-        ])
+])
+
+# Versão do prompt de geração: incrementar ao alterar o template, para que
+# testes gerados com o prompt anterior não sejam reaproveitados do cache
+_VERSAO_PROMPT = 1
+
+# Testes já gerados nesta execução (LRU): {chave: código}
+MAX_CACHE_TESTES = 128
+_cache_testes: "OrderedDict[str, str]" = OrderedDict()
+
+# Requisições simultâneas ao LLM na geração em lote
+MAX_CONCORRENCIA_LOTE = 8
+
+
+class GeradorTestes:
+    """Gerador de testes unitários para código C#."""
+    
+    def __init__(self):
+        """Inicializa o gerador com o LLM configurado."""
+        self.llm = criar_llm()
+        self.parser = ParserCodigo()
+        
+        if not self.llm:
+            raise ValueError("LLM não configurado. Verifique o arquivo .env")
+        
+        # Prompt, parser e chain não guardam estado entre chamadas: são
+        # montados uma única vez e reaproveitados a cada geração
+        self._prompt = _PROMPT_GERACAO
+        self._parser_saida = StrOutputParser()
+        self._chain = self._prompt | self.llm | self._parser_saida
+        
+        # Identidade do modelo, parte da chave do cache de testes gerados
+        nome_modelo = (
+            getattr(self.llm, "model_name", None)
+            or getattr(self.llm, "model", None)
+            or getattr(self.llm, "deployment_name", None)
+            or ""
+        )
+        self._identidade_modelo = f"{type(self.llm).__name__}:{nome_modelo}"
+    
+    def _montar_entrada(
+        self,
+        codigo_fonte: str,
+        testes_existentes: str,
+        iteracao: int
+    ) -> dict:
+        """Monta as variáveis de entrada do prompt de geração."""
+        return {
+            "source_code": codigo_fonte,
+            "existing_tests": testes_existentes or "Nenhum teste existente.",
+            "iteration": iteracao
+        }
+    
+    def _chave_cache(self, codigo_fonte: str, testes_existentes: str, iteracao: int) -> str:
+        """Hash das entradas que determinam o teste gerado (modelo, prompt, iteração e códigos)."""
+        return hashlib.blake2b(
+            f"{self._identidade_modelo}|{_VERSAO_PROMPT}|{iteracao}|{codigo_fonte}|{testes_existentes}".encode('utf-8'),
+            digest_size=16
+        ).hexdigest()
+    
+    def _teste_em_cache(self, chave: str) -> Optional[str]:
+        """Busca um teste gerado na memória e, em seguida, no disco."""
+        codigo_teste = _cache_testes.get(chave)
+        if codigo_teste is not None:
+            _cache_testes.move_to_end(chave)
+            return codigo_teste
+        
+        codigo_teste = carregar_teste_cache(chave)
+        if codigo_teste:
+            self._guardar_teste(chave, codigo_teste, persistir=False)
+        return codigo_teste
+    
+    def _guardar_teste(self, chave: str, codigo_teste: str, persistir: bool = True) -> None:
+        """Guarda um teste gerado na memória (LRU) e, opcionalmente, no disco."""
+        _cache_testes[chave] = codigo_teste
+        _cache_testes.move_to_end(chave)
+        if len(_cache_testes) > MAX_CACHE_TESTES:
+            _cache_testes.popitem(last=False)
+        if persistir:
+            salvar_teste_cache(chave, codigo_teste)
     
     def gerar_teste(
         self,
@@ -79,23 +154,156 @@ Retorne APENAS o código C# completo e válido, sem explicações adicionais."""
         if not codigo_fonte:
             return None
         
+        # Mesmas entradas já geradas (nesta ou em outra execução): sem chamar o LLM
+        chave = self._chave_cache(codigo_fonte, testes_existentes, iteracao)
+        codigo_teste = self._teste_em_cache(chave)
+        if codigo_teste:
+            return codigo_teste
+        
         try:
-            # Cria a chain de geração
-            prompt = self._criar_template_prompt()
-            parser_saida = StrOutputParser()
-            
-            chain = prompt | self.llm | parser_saida
-            
             # Gera o teste
-            resultado = chain.invoke({
-                "source_code": codigo_fonte,
-                "existing_tests": testes_existentes or "Nenhum teste existente.",
-                "iteration": iteracao
-            })
+            resultado = self._chain.invoke(
+                self._montar_entrada(codigo_fonte, testes_existentes, iteracao)
+            )
             
             # Limpa o resultado (remove markdown code blocks se houver)
             codigo_teste = self._limpar_codigo_gerado(resultado)
             
+            if codigo_teste:
+                self._guardar_teste(chave, codigo_teste)
+            return codigo_teste
+        
+        except Exception as e:
+            print(f"❌ Erro ao gerar teste: {e}")
+            return None
+    
+    def _separar_pendentes(
+        self,
+        entradas: List[Tuple[str, str, int]],
+        resultados: List[Optional[str]]
+    ) -> List[Tuple[int, str, dict]]:
+        """Preenche `resultados` com os testes em cache e devolve as entradas a gerar."""
+        pendentes = []
+        for indice, (codigo_fonte, testes_existentes, iteracao) in enumerate(entradas):
+            if not codigo_fonte:
+                continue
+            chave = self._chave_cache(codigo_fonte, testes_existentes, iteracao)
+            codigo_teste = self._teste_em_cache(chave)
+            if codigo_teste:
+                resultados[indice] = codigo_teste
+            else:
+                pendentes.append((indice, chave, self._montar_entrada(codigo_fonte, testes_existentes, iteracao)))
+        return pendentes
+    
+    def _registrar_respostas(
+        self,
+        pendentes: List[Tuple[int, str, dict]],
+        respostas: List[object],
+        resultados: List[Optional[str]]
+    ) -> List[Optional[str]]:
+        """Limpa e guarda as respostas do lote; erros viram None."""
+        for (indice, chave, _), resposta in zip(pendentes, respostas):
+            if isinstance(resposta, Exception):
+                print(f"❌ Erro ao gerar teste: {resposta}")
+                continue
+            codigo_teste = self._limpar_codigo_gerado(resposta)
+            if codigo_teste:
+                self._guardar_teste(chave, codigo_teste)
+            resultados[indice] = codigo_teste
+        return resultados
+    
+    def gerar_testes_lote(
+        self,
+        entradas: List[Tuple[str, str, int]]
+    ) -> List[Optional[str]]:
+        """
+        Gera testes para vários códigos, enviando ao LLM um único lote.
+        
+        As requisições do lote rodam em paralelo (até `MAX_CONCORRENCIA_LOTE`)
+        reaproveitando o mesmo cliente; entradas já presentes no cache não
+        são enviadas. A falha de uma entrada não interrompe as demais.
+        
+        Args:
+            entradas: Lista de (codigo_fonte, testes_existentes, iteracao)
+        
+        Returns:
+            Código do teste de cada entrada (mesma ordem), ou None em caso de erro
+        """
+        resultados: List[Optional[str]] = [None] * len(entradas)
+        pendentes = self._separar_pendentes(entradas, resultados)
+        if not pendentes:
+            return resultados
+        
+        respostas = self._chain.batch(
+            [entrada for _, _, entrada in pendentes],
+            config={"max_concurrency": MAX_CONCORRENCIA_LOTE},
+            return_exceptions=True
+        )
+        return self._registrar_respostas(pendentes, respostas, resultados)
+    
+    async def agerar_testes_lote(
+        self,
+        entradas: List[Tuple[str, str, int]]
+    ) -> List[Optional[str]]:
+        """
+        Versão assíncrona de `gerar_testes_lote` (usa `abatch`).
+        
+        Enquanto o lote aguarda o LLM, o event loop fica livre para outras
+        tarefas do agente (git, dotnet, leitura de relatórios).
+        
+        Args:
+            entradas: Lista de (codigo_fonte, testes_existentes, iteracao)
+        
+        Returns:
+            Código do teste de cada entrada (mesma ordem), ou None em caso de erro
+        """
+        resultados: List[Optional[str]] = [None] * len(entradas)
+        pendentes = self._separar_pendentes(entradas, resultados)
+        if not pendentes:
+            return resultados
+        
+        respostas = await self._chain.abatch(
+            [entrada for _, _, entrada in pendentes],
+            config={"max_concurrency": MAX_CONCORRENCIA_LOTE},
+            return_exceptions=True
+        )
+        return self._registrar_respostas(pendentes, respostas, resultados)
+    
+    async def agerar_teste(
+        self,
+        codigo_fonte: str,
+        testes_existentes: str = "",
+        iteracao: int = 0
+    ) -> Optional[str]:
+        """
+        Versão assíncrona de `gerar_teste`, consumindo a resposta do LLM em streaming.
+        
+        Args:
+            codigo_fonte: Código C# a ser testado
+            testes_existentes: Testes existentes (para evitar duplicação)
+            iteracao: Número da iteração atual
+        
+        Returns:
+            Código do teste gerado ou None em caso de erro
+        """
+        if not codigo_fonte:
+            return None
+        
+        chave = self._chave_cache(codigo_fonte, testes_existentes, iteracao)
+        codigo_teste = self._teste_em_cache(chave)
+        if codigo_teste:
+            return codigo_teste
+        
+        try:
+            trechos = []
+            async for trecho in self._chain.astream(
+                self._montar_entrada(codigo_fonte, testes_existentes, iteracao)
+            ):
+                trechos.append(trecho)
+            
+            codigo_teste = self._limpar_codigo_gerado("".join(trechos))
+            if codigo_teste:
+                self._guardar_teste(chave, codigo_teste)
             return codigo_teste
         
         except Exception as e:
@@ -112,20 +320,25 @@ Retorne APENAS o código C# completo e válido, sem explicações adicionais."""
         Returns:
             Código limpo
         """
-        # Remove blocos de código markdown
-        if "```csharp" in codigo:
-            codigo = codigo.split("```csharp")[1]
-        elif "```cs" in codigo:
-            codigo = codigo.split("```cs")[1]
-        elif "```" in codigo:
-            codigo = codigo.split("```")[1]
+        # Primeiro bloco de código markdown (```csharp, ```cs ou ```), até a
+        # cerca de fechamento ou o fim do texto (resposta truncada)
+        inicio = codigo.find(_CERCA)
+        if inicio == -1:
+            return codigo.strip()
         
-        if codigo.endswith("```"):
-            codigo = codigo[:-3]
+        inicio += len(_CERCA)
+        for linguagem in _LINGUAGENS_CERCA:
+            if codigo.startswith(linguagem, inicio):
+                inicio += len(linguagem)
+                break
         
-        return codigo.strip()
+        fim = codigo.find(_CERCA, inicio)
+        return codigo[inicio:fim if fim != -1 else len(codigo)].strip()
 
 
 # Alias para compatibilidade
 TestGenerator = GeradorTestes
 generate_test = GeradorTestes.gerar_teste
+agenerate_test = GeradorTestes.agerar_teste
+generate_tests_batch = GeradorTestes.gerar_testes_lote
+agenerate_tests_batch = GeradorTestes.agerar_testes_lote
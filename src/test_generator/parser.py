@@ -4,6 +4,22 @@ from typing import List, Dict, Any
 import re
 
 
+# Os padrões são de str, não de bytes: código ASCII já é armazenado com 1 byte
+# por caractere (PEP 393), e \w precisa casar identificadores acentuados
+# (ex: `class Cálculo`), que em padrões de bytes seriam truncados.
+
+# Padrões compilados uma única vez (aplicados às linhas já sem espaços nas pontas)
+# Início de classe, capturando o nome
+_RE_CLASSE = re.compile(r'^(?:public\s+)?(?:abstract\s+)?(?:sealed\s+)?class\s+(\w+)')
+# Método público, capturando o primeiro identificador seguido de '('
+_RE_METODO_PUBLICO = re.compile(r'^public\s+.*?(\w+)\s*\(')
+# Linhas candidatas a método público (pré-filtro sobre o código inteiro)
+_RE_CANDIDATO_METODO = re.compile(r'^[^\S\n]*public[^\S\n]', re.MULTILINE)
+# Declaração 'using' em uma linha inteira (busca no código todo de uma vez,
+# sem materializar a lista de linhas); o alvo não pode ser vazio
+_RE_USING = re.compile(r'^[^\S\n]*using[^\S\n]+([^\s;][^;\n]*);[^\S\n]*$', re.MULTILINE)
+
+
 class ParserCodigo:
     """Parser para analisar código C# e extrair informações."""
     
@@ -28,12 +44,13 @@ class ParserCodigo:
         for i, linha in enumerate(linhas, 1):
             linha_limpa = linha.strip()
             
-            # Detecta início de classe
-            if re.match(r'^\s*(public\s+)?(abstract\s+)?(sealed\s+)?class\s+\w+', linha_limpa):
+            # Detecta início de classe (o mesmo match já traz o nome)
+            match_classe = _RE_CLASSE.match(linha_limpa)
+            if match_classe:
                 if classe_atual:
                     classes.append(classe_atual)
                 
-                nome_classe = re.search(r'class\s+(\w+)', linha_limpa).group(1)
+                nome_classe = match_classe.group(1)
                 classe_atual = {
                     "nome": nome_classe,
                     "linha_inicio": i,
@@ -47,14 +64,13 @@ class ParserCodigo:
                 contador_chaves += linha_limpa.count('{') - linha_limpa.count('}')
                 
                 # Detecta métodos
-                if re.match(r'^\s*public\s+.*\(', linha_limpa):
-                    match_metodo = re.search(r'(\w+)\s*\(', linha_limpa)
-                    if match_metodo:
-                        nome_metodo = match_metodo.group(1)
-                        classe_atual["metodos"].append({
-                            "nome": nome_metodo,
-                            "linha": i
-                        })
+                match_metodo = _RE_METODO_PUBLICO.match(linha_limpa)
+                if match_metodo:
+                    nome_metodo = match_metodo.group(1)
+                    classe_atual["metodos"].append({
+                        "nome": nome_metodo,
+                        "linha": i
+                    })
                 
                 # Fim da classe
                 if contador_chaves == 0 and '{' not in linha_limpa:
@@ -80,21 +96,27 @@ class ParserCodigo:
             Lista de métodos encontrados
         """
         metodos = []
-        linhas = codigo.split('\n')
+        numero_linha = 1
+        posicao_anterior = 0
         
-        for i, linha in enumerate(linhas, 1):
-            linha_limpa = linha.strip()
+        # O pré-filtro (em C, no motor de regex) localiza só as linhas que
+        # começam com 'public'; as demais nunca viram strings em Python
+        for candidato in _RE_CANDIDATO_METODO.finditer(codigo):
+            inicio = candidato.start()
+            numero_linha += codigo.count('\n', posicao_anterior, inicio)
+            posicao_anterior = inicio
+            
+            fim = codigo.find('\n', inicio)
+            linha_limpa = codigo[inicio:fim if fim != -1 else len(codigo)].strip()
             
             # Padrão para métodos públicos
-            if re.match(r'^\s*public\s+.*\(', linha_limpa):
-                match_metodo = re.search(r'(\w+)\s*\(', linha_limpa)
-                if match_metodo:
-                    nome_metodo = match_metodo.group(1)
-                    metodos.append({
-                        "nome": nome_metodo,
-                        "linha": i,
-                        "assinatura": linha_limpa
-                    })
+            match_metodo = _RE_METODO_PUBLICO.match(linha_limpa)
+            if match_metodo:
+                metodos.append({
+                    "nome": match_metodo.group(1),
+                    "linha": numero_linha,
+                    "assinatura": linha_limpa
+                })
         
         return metodos
     
@@ -109,13 +131,7 @@ class ParserCodigo:
         Returns:
             Lista de namespaces importados
         """
-        usings = []
-        for linha in codigo.split('\n'):
-            linha_limpa = linha.strip()
-            if linha_limpa.startswith('using ') and linha_limpa.endswith(';'):
-                namespace = linha_limpa[6:-1].strip()
-                usings.append(namespace)
-        return usings
+        return [match.group(1).strip() for match in _RE_USING.finditer(codigo)]
 
 
 # Aliases para compatibilidade
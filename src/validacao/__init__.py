@@ -8,6 +8,8 @@ from .utilidades import (
     imprimir_erro,
     imprimir_aviso,
     imprimir_info,
+    imprimir_info_lote,
+    imprimir_info_lista,
     Cores
 )
 
@@ -21,6 +23,8 @@ __all__ = [
     "imprimir_erro",
     "imprimir_aviso",
     "imprimir_info",
+    "imprimir_info_lote",
+    "imprimir_info_lista",
     "Cores"
 ]
 
@@ -0,0 +1,155 @@
+"""Cache em disco do assistente: validação do ambiente, diffs e testes gerados."""
+
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+from pathlib import Path
+
+from .utilidades import imprimir_aviso
+
+
+def _diretorio_cache() -> Path:
+    """Diretório do cache (respeita XDG_CACHE_HOME, padrão ~/.cache)."""
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "cover-check-assistant"
+
+
+def calcular_impressao_ambiente(arquivos_csproj: List[Path], versao_dotnet: str) -> str:
+    """
+    Calcula a impressão digital do ambiente .NET.
+
+    Combina (caminho, mtime, tamanho) de cada .csproj com a versão do dotnet:
+    qualquer alteração em um projeto ou atualização do SDK gera outra impressão,
+    invalidando o cache automaticamente.
+
+    Args:
+        arquivos_csproj: Arquivos .csproj do repositório
+        versao_dotnet: Saída de `dotnet --version`
+
+    Returns:
+        Hash SHA1 em hexadecimal
+    """
+    impressao = hashlib.sha1(versao_dotnet.encode('utf-8'))
+
+    for caminho in sorted(str(arquivo) for arquivo in arquivos_csproj):
+        try:
+            info = os.stat(caminho)
+            impressao.update(f"\0{caminho}\0{info.st_mtime_ns}\0{info.st_size}".encode('utf-8'))
+        except OSError:
+            impressao.update(f"\0{caminho}\0-".encode('utf-8'))
+
+    return impressao.hexdigest()
+
+
+def _carregar_json(nome: str) -> Optional[Any]:
+    """Lê um arquivo JSON do cache; None se não existir ou estiver ilegível."""
+    try:
+        with open(_diretorio_cache() / nome, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _salvar_json(nome: str, dados: Any) -> None:
+    """
+    Salva um arquivo JSON no cache de forma atômica (arquivo temporário + rename).
+
+    Falhas de escrita apenas geram aviso: o cache é uma otimização.
+    """
+    diretorio = _diretorio_cache()
+
+    try:
+        diretorio.mkdir(parents=True, exist_ok=True)
+        descritor, temporario = tempfile.mkstemp(dir=diretorio, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(descritor, 'w', encoding='utf-8') as f:
+                json.dump(dados, f)
+            os.replace(temporario, diretorio / nome)
+        except BaseException:
+            os.unlink(temporario)
+            raise
+    except OSError as e:
+        imprimir_aviso(f"Não foi possível salvar o cache ({nome}): {e}")
+
+
+def carregar_ambiente_cache(impressao: str) -> Optional[Dict[str, Any]]:
+    """
+    Carrega a validação do ambiente salva para a impressão informada.
+
+    Args:
+        impressao: Impressão digital do ambiente
+
+    Returns:
+        Dados salvos ou None se não houver cache (ou se estiver ilegível)
+    """
+    return _carregar_json(f"env-{impressao}.json")
+
+
+def salvar_ambiente_cache(impressao: str, dados: Dict[str, Any]) -> None:
+    """
+    Salva a validação do ambiente para a impressão informada.
+
+    Args:
+        impressao: Impressão digital do ambiente
+        dados: Dados serializáveis em JSON
+    """
+    _salvar_json(f"env-{impressao}.json", dados)
+
+
+# Versão do formato dos diffs salvos (v2: intervalos [inicio, fim] por arquivo)
+_VERSAO_DIFF = 2
+
+
+def carregar_diff_cache(sha_base: str, sha_head: str) -> Optional[Dict[str, List[List[int]]]]:
+    """
+    Carrega o diff salvo entre dois commits.
+
+    O diff entre dois commits é imutável, então a entrada nunca precisa ser invalidada.
+
+    Args:
+        sha_base: SHA do commit base
+        sha_head: SHA do commit HEAD
+
+    Returns:
+        Dicionário {arquivo: [[inicio, fim], ...]} ou None se não houver cache
+    """
+    return _carregar_json(f"diff-v{_VERSAO_DIFF}-{sha_base}-{sha_head}.json")
+
+
+def salvar_diff_cache(sha_base: str, sha_head: str, diff: Dict[str, List[Tuple[int, int]]]) -> None:
+    """
+    Salva o diff entre dois commits.
+
+    Args:
+        sha_base: SHA do commit base
+        sha_head: SHA do commit HEAD
+        diff: Dicionário {arquivo: [(inicio, fim), ...]}
+    """
+    _salvar_json(f"diff-v{_VERSAO_DIFF}-{sha_base}-{sha_head}.json", diff)
+
+
+def carregar_teste_cache(chave: str) -> Optional[str]:
+    """
+    Carrega um teste gerado anteriormente para a chave informada.
+
+    Args:
+        chave: Hash das entradas da geração (modelo, iteração, código e testes)
+
+    Returns:
+        Código do teste ou None se não houver cache
+    """
+    dados = _carregar_json(f"teste-{chave}.json")
+    return dados.get("codigo") if isinstance(dados, dict) else None
+
+
+def salvar_teste_cache(chave: str, codigo: str) -> None:
+    """
+    Salva um teste gerado para a chave informada.
+
+    Args:
+        chave: Hash das entradas da geração
+        codigo: Código do teste gerado
+    """
+    _salvar_json(f"teste-{chave}.json", {"codigo": codigo})
@@ -1,10 +1,13 @@
 """Gerenciamento de cobertura de código .NET."""
 
-import json
+import hashlib
+import os
 import shutil
-from typing import List, Optional, Dict, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Dict, Sequence, Tuple
 from pathlib import Path
 
+from .git import linha_modificada
 from .utilidades import (
     executar_comando,
     imprimir_info,
@@ -14,10 +17,79 @@ from .utilidades import (
 )
 
 
+# Saída reduzida do `dotnet test`: sem logo, MSBuild silencioso e apenas o
+# resumo (e as falhas) dos testes no console
+_ARGS_SAIDA_TESTE = ('--nologo', '-v:q', '--logger:console;verbosity=minimal')
+
+
+def _mover_arquivo(origem: Path, destino: Path):
+    """
+    Move um arquivo, substituindo o destino.
+    
+    No mesmo sistema de arquivos é um único `rename` atômico; entre sistemas
+    de arquivos diferentes cai para `shutil.move` (cópia + remoção).
+    """
+    try:
+        os.replace(origem, destino)
+    except OSError:
+        shutil.move(str(origem), str(destino))
+
+
+def _vincular_ou_copiar(origem: Path, destino: Path):
+    """
+    Disponibiliza `origem` em `destino` sem copiar o conteúdo, se possível.
+    
+    No mesmo sistema de arquivos cria um hard link (o arquivo de cobertura
+    não é alterado depois de gerado, só substituído); caso contrário copia
+    apenas os dados, sem metadados (`shutil.copyfile`).
+    """
+    if destino.exists():
+        destino.unlink()
+    try:
+        if origem.stat().st_dev == destino.parent.stat().st_dev:
+            os.link(origem, destino)
+            return
+    except OSError:
+        pass
+    shutil.copyfile(origem, destino)
+
+
+def compilar_projeto_teste(caminho_projeto_teste: Path) -> bool:
+    """
+    Compila um projeto de teste (e suas referências) com o MSBuild em paralelo.
+    
+    Args:
+        caminho_projeto_teste: Caminho para o arquivo .csproj de teste
+    
+    Returns:
+        True se a compilação foi bem-sucedida
+    """
+    imprimir_info(f"Compilando projeto de teste: {caminho_projeto_teste.name}")
+    build_resultado = executar_comando(
+        [
+            'dotnet', 'build', os.fspath(caminho_projeto_teste),
+            '-maxcpucount', '-p:BuildInParallel=true',
+            # O dotnet build escreve os erros no stdout: capturado, mas
+            # reduzido aos erros e ao resumo
+            '--nologo', '-v:q', '-clp:ErrorsOnly;Summary'
+        ],
+        diretorio=caminho_projeto_teste.parent,
+        verificar=False
+    )
+    
+    if build_resultado.returncode != 0:
+        imprimir_erro(f"Falha ao compilar projeto de teste: {caminho_projeto_teste.name}")
+        if build_resultado.stdout:
+            imprimir_erro(f"Erro: {build_resultado.stdout.strip()}")
+        return False
+    return True
+
+
 def executar_testes_com_cobertura(
     caminho_projeto_teste: Path,
     tipo_coverlet: str,
-    diretorio_saida: Path
+    diretorio_saida: Path,
+    compilar: bool = True
 ) -> Optional[Path]:
     """
     Executa testes com cobertura usando Coverlet.
@@ -26,6 +98,9 @@ def executar_testes_com_cobertura(
         caminho_projeto_teste: Caminho para o arquivo .csproj de teste
         tipo_coverlet: Tipo de Coverlet ('collector' ou 'msbuild')
         diretorio_saida: Diretório para salvar arquivos de cobertura
+        compilar: Se True, o próprio `dotnet test` compila o projeto (um único
+            processo do MSBuild); se False, assume o projeto já compilado
+            (`dotnet test --no-build`)
     
     Returns:
         Caminho para o arquivo de cobertura gerado ou None em caso de erro
@@ -39,27 +114,25 @@ def executar_testes_com_cobertura(
     nome_arquivo = f"{caminho_projeto_teste.stem}_coverage.cobertura.xml"
     arquivo_cobertura = diretorio_saida / nome_arquivo
     
+    # Diretório de resultados exclusivo do projeto: o collector sempre gera
+    # `coverage.cobertura.xml`, e projetos executados em paralelo não podem
+    # encontrar o arquivo um do outro
+    diretorio_resultados = diretorio_saida / caminho_projeto_teste.stem
+    
+    # Sem build separado, o `dotnet test` compila e testa na mesma avaliação
+    # do projeto; o `--no-build` fica só para projetos já compilados
+    args_build = () if compilar else ('--no-build',)
+    
     try:
-        # Primeiro, faz build do projeto
-        imprimir_info("Compilando projeto de teste...")
-        build_resultado = executar_comando(
-            ['dotnet', 'build', str(caminho_projeto_teste)],
-            diretorio=caminho_projeto_teste.parent,
-            verificar=False
-        )
-        
-        if build_resultado.returncode != 0:
-            imprimir_erro("Falha ao compilar projeto de teste")
-            return None
-        
         if tipo_coverlet == 'collector':
             # Usa coverlet.collector (via runsettings)
             comando = [
                 'dotnet', 'test',
-                str(caminho_projeto_teste),
+                os.fspath(caminho_projeto_teste),
                 '--collect:"XPlat Code Coverage"',
-                '--results-directory', str(diretorio_saida),
-                '--no-build',  # Já fizemos build acima
+                '--results-directory', os.fspath(diretorio_resultados),
+                *args_build,
+                *_ARGS_SAIDA_TESTE,
                 '--',
                 'DataCollectionRunSettings.DataCollectors.DataCollector.Configuration.Format=cobertura'
             ]
@@ -67,27 +140,34 @@ def executar_testes_com_cobertura(
             # Usa coverlet.msbuild
             comando = [
                 'dotnet', 'test',
-                str(caminho_projeto_teste),
+                os.fspath(caminho_projeto_teste),
                 '/p:CollectCoverage=true',
                 f'/p:CoverletOutputFormat=cobertura',
                 f'/p:CoverletOutput={arquivo_cobertura}',
-                '--no-build'  # Já fizemos build acima
+                *args_build,
+                *_ARGS_SAIDA_TESTE
             ]
         
+        # Compilando aqui, os erros do MSBuild saem no stdout: capturado (já
+        # reduzido por `-v:q`) para ser exibido em caso de falha, como em
+        # `compilar_projeto_teste`
         resultado = executar_comando(
             comando,
             diretorio=caminho_projeto_teste.parent,
-            verificar=False
+            verificar=False,
+            capturar_stdout=compilar
         )
         
         if resultado.returncode == 0:
             # Para collector, precisa encontrar o arquivo gerado
             if tipo_coverlet == 'collector':
-                # Procura por arquivos coverage.cobertura.xml no diretório de saída
-                arquivos_encontrados = list(diretorio_saida.rglob('coverage.cobertura.xml'))
-                if arquivos_encontrados:
+                # O collector grava em `<resultados>/<guid>/coverage.cobertura.xml`;
+                # arquivos de execuções anteriores já foram movidos, então o
+                # primeiro encontrado um nível abaixo é o desta execução
+                arquivo_encontrado = next(diretorio_resultados.glob('*/coverage.cobertura.xml'), None)
+                if arquivo_encontrado is not None:
                     # Move para nome padronizado
-                    shutil.move(str(arquivos_encontrados[0]), str(arquivo_cobertura))
+                    _mover_arquivo(arquivo_encontrado, arquivo_cobertura)
                     imprimir_sucesso(f"Cobertura gerada: {arquivo_cobertura.name}")
                     return arquivo_cobertura
                 else:
@@ -101,7 +181,12 @@ def executar_testes_com_cobertura(
                     imprimir_aviso("Arquivo de cobertura não foi criado")
                     return None
         else:
-            imprimir_erro(f"Falha ao executar testes: código {resultado.returncode}")
+            if compilar and resultado.stdout and ': error ' in resultado.stdout:
+                imprimir_erro(f"Falha ao compilar projeto de teste: {caminho_projeto_teste.name}")
+            else:
+                imprimir_erro(f"Falha ao executar testes: código {resultado.returncode}")
+            if resultado.stdout:
+                imprimir_erro(f"Erro: {resultado.stdout.strip()}")
             if resultado.stderr:
                 imprimir_erro(f"Erro: {resultado.stderr[:500]}")
             return None
@@ -111,6 +196,113 @@ def executar_testes_com_cobertura(
         return None
 
 
+def executar_testes_com_cobertura_paralelo(
+    projetos_teste: Sequence[Path],
+    tipos_coverlet: Sequence[str],
+    diretorio_saida: Path
+) -> List[Optional[Path]]:
+    """
+    Executa os testes de vários projetos com cobertura, em paralelo.
+    
+    Os builds rodam em sequência (cada um já paraleliza o MSBuild entre
+    núcleos): projetos de teste costumam referenciar os mesmos projetos de
+    produção, e builds simultâneos disputariam os mesmos `bin/` e `obj/`.
+    Em seguida, um `dotnet test --no-build` por projeto roda em paralelo,
+    cada um gravando no seu próprio diretório de resultados.
+    
+    Args:
+        projetos_teste: Projetos de teste (.csproj)
+        tipos_coverlet: Tipo de Coverlet de cada projeto, na mesma posição
+        diretorio_saida: Diretório para salvar arquivos de cobertura
+    
+    Returns:
+        Arquivo de cobertura de cada projeto (mesma ordem), ou None se falhou
+    """
+    resultados: List[Optional[Path]] = [None] * len(projetos_teste)
+    
+    # Um único projeto não tem com quem disputar `bin/` e `obj/`: o próprio
+    # `dotnet test` compila e testa, sem um segundo processo do MSBuild
+    if len(projetos_teste) == 1:
+        resultados[0] = executar_testes_com_cobertura(
+            projetos_teste[0], tipos_coverlet[0], diretorio_saida
+        )
+        return resultados
+    
+    compilados = []
+    for indice, projeto in enumerate(projetos_teste):
+        try:
+            if compilar_projeto_teste(projeto):
+                compilados.append(indice)
+        except Exception as e:
+            imprimir_erro(f"Erro ao compilar {projeto.name}: {e}")
+    
+    if not compilados:
+        return resultados
+    
+    max_workers = min(len(compilados), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        arquivos = executor.map(
+            lambda indice: executar_testes_com_cobertura(
+                projetos_teste[indice], tipos_coverlet[indice], diretorio_saida, compilar=False
+            ),
+            compilados
+        )
+        for indice, arquivo in zip(compilados, arquivos):
+            resultados[indice] = arquivo
+    
+    return resultados
+
+
+def _remover_cobertura_duplicada(arquivos_cobertura: Sequence[Path]) -> List[Path]:
+    """
+    Remove entradas repetidas (mesmo caminho ou mesmo conteúdo), mantendo a
+    ordem da primeira ocorrência.
+    
+    Só arquivos com tamanho igual ao de outro são lidos e comparados por hash
+    (`blake2b`); os demais são distintos sem nenhuma leitura.
+    
+    Args:
+        arquivos_cobertura: Arquivos de cobertura
+    
+    Returns:
+        Lista sem duplicatas
+    """
+    unicos = []
+    caminhos_vistos = set()
+    por_tamanho: Dict[int, List[Path]] = {}
+    
+    for arquivo in arquivos_cobertura:
+        caminho = os.path.realpath(arquivo)
+        if caminho in caminhos_vistos:
+            continue
+        caminhos_vistos.add(caminho)
+        unicos.append(arquivo)
+        try:
+            por_tamanho.setdefault(os.path.getsize(arquivo), []).append(arquivo)
+        except OSError:
+            pass
+    
+    duplicados = set()
+    for mesmo_tamanho in por_tamanho.values():
+        if len(mesmo_tamanho) < 2:
+            continue
+        hashes_vistos = set()
+        for arquivo in mesmo_tamanho:
+            try:
+                with open(arquivo, 'rb') as f:
+                    digest = hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=16)).digest()
+            except OSError:
+                continue
+            if digest in hashes_vistos:
+                duplicados.add(arquivo)
+            hashes_vistos.add(digest)
+    
+    if duplicados:
+        imprimir_info(f"{len(duplicados)} arquivo(s) de cobertura duplicado(s) ignorado(s)")
+    
+    return [arquivo for arquivo in unicos if arquivo not in duplicados]
+
+
 def mesclar_arquivos_cobertura(
     arquivos_cobertura: List[Path],
     arquivo_saida: Path
@@ -129,10 +321,12 @@ def mesclar_arquivos_cobertura(
         imprimir_aviso("Nenhum arquivo de cobertura para mesclar")
         return False
     
+    arquivos_cobertura = _remover_cobertura_duplicada(arquivos_cobertura)
+    
     if len(arquivos_cobertura) == 1:
-        # Apenas um arquivo, copia para saída
+        # Apenas um arquivo, copia (ou vincula) para saída
         imprimir_info("Apenas um arquivo de cobertura, copiando...")
-        shutil.copy(str(arquivos_cobertura[0]), str(arquivo_saida))
+        _vincular_ou_copiar(arquivos_cobertura[0], arquivo_saida)
         imprimir_sucesso(f"Arquivo copiado: {arquivo_saida.name}")
         return True
     
@@ -142,20 +336,21 @@ def mesclar_arquivos_cobertura(
         # Usa ReportGenerator para mesclar
         comando = [
             'reportgenerator',
-            f'-reports:{";".join(str(f) for f in arquivos_cobertura)}',
+            f'-reports:{";".join(map(os.fspath, arquivos_cobertura))}',
             f'-targetdir:{arquivo_saida.parent}',
             '-reporttypes:Cobertura',
-            f'-assemblyfilters:+*'
+            f'-assemblyfilters:+*',
+            '-verbosity:Warning'
         ]
         
-        resultado = executar_comando(comando, verificar=False)
+        resultado = executar_comando(comando, verificar=False, capturar_stdout=False)
         
         if resultado.returncode == 0:
             # ReportGenerator cria Cobertura.xml
             arquivo_gerado = arquivo_saida.parent / 'Cobertura.xml'
             if arquivo_gerado.exists():
                 # Renomeia para o nome desejado
-                shutil.move(str(arquivo_gerado), str(arquivo_saida))
+                _mover_arquivo(arquivo_gerado, arquivo_saida)
                 imprimir_sucesso(f"Arquivos mesclados: {arquivo_saida.name}")
                 return True
             else:
@@ -201,10 +396,11 @@ def gerar_relatorio_html(
             f'-reports:{arquivo_cobertura}',
             f'-targetdir:{diretorio_saida}',
             '-reporttypes:Html',
-            f'-title:{titulo}'
+            f'-title:{titulo}',
+            '-verbosity:Warning'
         ]
         
-        resultado = executar_comando(comando, verificar=False)
+        resultado = executar_comando(comando, verificar=False, capturar_stdout=False)
         
         if resultado.returncode == 0:
             arquivo_index = diretorio_saida / 'index.html'
@@ -225,84 +421,246 @@ def gerar_relatorio_html(
         return False
 
 
-def filtrar_cobertura_por_diff(
+def gerar_saidas_cobertura(
+    arquivos_cobertura: List[Path],
+    arquivo_mesclado: Path,
+    diretorio_html: Path,
+    titulo: str = "Relatório de Cobertura"
+) -> Tuple[bool, bool]:
+    """
+    Mescla os arquivos de cobertura e gera o relatório HTML em uma única
+    execução do ReportGenerator (`-reporttypes:Cobertura;Html`).
+    
+    Equivale a `mesclar_arquivos_cobertura` seguido de `gerar_relatorio_html`,
+    mas inicializa o .NET e lê os relatórios de entrada uma só vez. Com um
+    único arquivo não há o que mesclar: ele é copiado (ou vinculado) e só o
+    HTML é gerado.
+    
+    Args:
+        arquivos_cobertura: Arquivos de cobertura de cada projeto
+        arquivo_mesclado: Caminho para o arquivo Cobertura mesclado
+        diretorio_html: Diretório para salvar o relatório HTML
+        titulo: Título do relatório
+    
+    Returns:
+        (mesclagem bem-sucedida, relatório HTML gerado)
+    """
+    if not arquivos_cobertura:
+        imprimir_aviso("Nenhum arquivo de cobertura para mesclar")
+        return False, False
+    
+    arquivos_cobertura = _remover_cobertura_duplicada(arquivos_cobertura)
+    
+    if len(arquivos_cobertura) == 1:
+        # Apenas um arquivo, copia (ou vincula) para saída
+        imprimir_info("Apenas um arquivo de cobertura, copiando...")
+        _vincular_ou_copiar(arquivos_cobertura[0], arquivo_mesclado)
+        imprimir_sucesso(f"Arquivo copiado: {arquivo_mesclado.name}")
+        return True, gerar_relatorio_html(arquivo_mesclado, diretorio_html, titulo)
+    
+    imprimir_info(f"Mesclando {len(arquivos_cobertura)} arquivos e gerando relatório HTML: {titulo}")
+    diretorio_html.mkdir(parents=True, exist_ok=True)
+    
+    try:
+        comando = [
+            'reportgenerator',
+            f'-reports:{";".join(map(os.fspath, arquivos_cobertura))}',
+            f'-targetdir:{diretorio_html}',
+            '-reporttypes:Cobertura;Html',
+            f'-title:{titulo}',
+            f'-assemblyfilters:+*',
+            '-verbosity:Warning'
+        ]
+        
+        resultado = executar_comando(comando, verificar=False, capturar_stdout=False)
+        
+        if resultado.returncode != 0:
+            imprimir_erro("Falha ao mesclar arquivos de cobertura e gerar relatório HTML")
+            if resultado.stderr:
+                imprimir_erro(f"Erro: {resultado.stderr[:500]}")
+            return False, False
+        
+        # ReportGenerator cria Cobertura.xml ao lado do index.html
+        mesclado_ok = False
+        arquivo_gerado = diretorio_html / 'Cobertura.xml'
+        if arquivo_gerado.exists():
+            _mover_arquivo(arquivo_gerado, arquivo_mesclado)
+            imprimir_sucesso(f"Arquivos mesclados: {arquivo_mesclado.name}")
+            mesclado_ok = True
+        else:
+            imprimir_erro("Arquivo mesclado não foi criado")
+        
+        arquivo_index = diretorio_html / 'index.html'
+        html_ok = arquivo_index.exists()
+        if html_ok:
+            imprimir_sucesso(f"Relatório HTML gerado: {arquivo_index}")
+        else:
+            imprimir_erro("Arquivo index.html não foi criado")
+        
+        return mesclado_ok, html_ok
+    
+    except Exception as e:
+        imprimir_erro(f"Erro ao mesclar arquivos e gerar relatório HTML: {e}")
+        return False, False
+
+
+def _resumo_da_raiz(atributos: Dict[str, str]) -> Dict[str, float]:
+    """Monta o resumo de cobertura a partir dos atributos do elemento raiz."""
+    # Extrai métricas do elemento raiz
+    line_rate = float(atributos.get('line-rate', 0.0))
+    branch_rate = float(atributos.get('branch-rate', 0.0))
+    
+    # Conta linhas
+    lines_covered = int(atributos.get('lines-covered', 0))
+    lines_valid = int(atributos.get('lines-valid', 0))
+    
+    return {
+        'line_coverage': line_rate * 100,  # Converte para percentual
+        'branch_coverage': branch_rate * 100,
+        'lines_covered': lines_covered,
+        'lines_valid': lines_valid,
+        'lines_uncovered': lines_valid - lines_covered
+    }
+
+
+def filtrar_e_resumir_cobertura(
     arquivo_cobertura: Path,
-    arquivos_modificados: Dict[str, Set[int]],
+    arquivos_modificados: Dict[str, Sequence[Tuple[int, int]]],
     arquivo_saida: Path
-) -> bool:
+) -> Tuple[bool, Optional[Dict[str, float]]]:
     """
-    Filtra arquivo de cobertura para incluir apenas linhas modificadas.
+    Filtra o arquivo de cobertura pelo diff e extrai o resumo em uma única leitura.
+    
+    O XML é lido em streaming (`iterparse`) e o arquivo filtrado é escrito à
+    medida que os elementos terminam; cada elemento é descartado logo depois,
+    então a memória fica proporcional à profundidade do XML, não ao seu tamanho.
     
     Args:
         arquivo_cobertura: Arquivo de cobertura original
-        arquivos_modificados: Dict {arquivo: {linhas modificadas}}
+        arquivos_modificados: Dict {arquivo: intervalos (inicio, fim) de linhas modificadas}
         arquivo_saida: Arquivo de saída filtrado
     
     Returns:
-        True se filtragem foi bem-sucedida, False caso contrário
+        Tupla (filtragem_ok, resumo) - resumo é o de `extrair_resumo_cobertura`
+        para o arquivo original, ou None se a leitura falhar
     """
     imprimir_info("Filtrando cobertura por diff...")
     
     if not arquivo_cobertura.exists():
         imprimir_erro(f"Arquivo de cobertura não encontrado: {arquivo_cobertura}")
-        return False
-    
-    if not arquivos_modificados:
-        imprimir_aviso("Nenhum arquivo modificado para filtrar")
-        return False
+        return False, None
     
     try:
+        # O `iterparse` da stdlib já usa o expat em C; o custo restante está no
+        # laço Python por evento, que o lxml não elimina (e ele não é dependência)
         import xml.etree.ElementTree as ET
-        
-        # Parse do arquivo de cobertura
-        tree = ET.parse(arquivo_cobertura)
-        root = tree.getroot()
+        from xml.sax.saxutils import XMLGenerator
         
         # Normaliza caminhos dos arquivos modificados (usa apenas nome do arquivo)
-        arquivos_mod_normalizados = {}
-        for caminho, linhas in arquivos_modificados.items():
-            # Converte para Path e pega apenas o nome do arquivo
-            nome_arquivo = Path(caminho).name
-            arquivos_mod_normalizados[nome_arquivo] = linhas
+        arquivos_mod_normalizados = {
+            Path(caminho).name: intervalos
+            for caminho, intervalos in arquivos_modificados.items()
+        }
         
+        # Intervalos por atributo `filename` exatamente como aparece no XML:
+        # classes do mesmo arquivo (parciais, aninhadas, geradas) não repetem
+        # a extração do nome
+        intervalos_por_filename: Dict[str, Optional[Sequence[Tuple[int, int]]]] = {}
+        
+        resumo = None
         linhas_filtradas = 0
         linhas_totais = 0
         
-        # Itera sobre as classes no XML de cobertura
-        for package in root.findall('.//package'):
-            for classe in package.findall('classes/class'):
-                filename = classe.get('filename', '')
-                nome_arquivo = Path(filename).name
-                
-                # Verifica se este arquivo foi modificado
-                if nome_arquivo in arquivos_mod_normalizados:
-                    linhas_modificadas = arquivos_mod_normalizados[nome_arquivo]
+        # Pilha de (elemento, tag, é_emitido); uma classe de arquivo não
+        # modificado ou uma linha fora do diff não é emitida, nem seus descendentes
+        pilha = []
+        intervalos_classe = None
+        
+        with open(arquivo_saida, 'w', encoding='utf-8') as saida:
+            gerador = XMLGenerator(saida, encoding='utf-8', short_empty_elements=True)
+            gerador.startDocument()
+            
+            for evento, elemento in ET.iterparse(str(arquivo_cobertura), events=('start', 'end')):
+                if evento == 'start':
+                    tag = elemento.tag
                     
-                    # Filtra linhas
-                    for linha in classe.findall('lines/line'):
-                        numero_linha = int(linha.get('number', 0))
-                        linhas_totais += 1
-                        
-                        # Remove linhas que não foram modificadas
-                        if numero_linha not in linhas_modificadas:
-                            classe.find('lines').remove(linha)
-                        else:
-                            linhas_filtradas += 1
+                    if not pilha:
+                        resumo = _resumo_da_raiz(elemento.attrib)
+                        emitido = True
+                    else:
+                        _, tag_pai, emitido = pilha[-1]
+                        # Descendentes de um elemento descartado são descartados
+                        # sem nenhuma outra verificação (a maior parte do XML)
+                        if emitido:
+                            if tag == 'class' and tag_pai == 'classes':
+                                filename = elemento.get('filename', '')
+                                if filename in intervalos_por_filename:
+                                    intervalos_classe = intervalos_por_filename[filename]
+                                else:
+                                    intervalos_classe = arquivos_mod_normalizados.get(Path(filename).name)
+                                    intervalos_por_filename[filename] = intervalos_classe
+                                # Remove classe inteira se arquivo não foi modificado
+                                emitido = intervalos_classe is not None
+                            elif tag == 'line' and tag_pai == 'lines' and len(pilha) > 1 and pilha[-2][1] == 'class':
+                                linhas_totais += 1
+                                # Só linhas de classes modificadas chegam aqui: o
+                                # `int()` por linha é uma fração ínfima do parse
+                                numero_linha = int(elemento.get('number', 0))
+                                # Remove linhas que não foram modificadas
+                                emitido = linha_modificada(intervalos_classe, numero_linha)
+                                if emitido:
+                                    linhas_filtradas += 1
+                    
+                    pilha.append((elemento, tag, emitido))
+                    if emitido:
+                        gerador.startElement(tag, elemento.attrib)
                 else:
-                    # Remove classe inteira se arquivo não foi modificado
-                    package.find('classes').remove(classe)
-        
-        # Salva arquivo filtrado
-        tree.write(str(arquivo_saida), encoding='utf-8', xml_declaration=True)
+                    _, tag, emitido = pilha.pop()
+                    if emitido:
+                        # Cobertura só tem texto em elementos folha (ex: <source>);
+                        # a indentação entre elementos é descartada
+                        if elemento.text and elemento.text.strip():
+                            gerador.characters(elemento.text)
+                        gerador.endElement(tag)
+                    # Descarta o elemento já processado
+                    if pilha:
+                        pilha[-1][0].remove(elemento)
+                    elemento.clear()
+            
+            gerador.endDocument()
         
         imprimir_sucesso(f"Cobertura filtrada: {linhas_filtradas} de {linhas_totais} linhas mantidas")
         imprimir_info(f"Arquivo salvo: {arquivo_saida}")
         
-        return True
+        return True, resumo
     
     except Exception as e:
         imprimir_erro(f"Erro ao filtrar cobertura: {e}")
+        return False, None
+
+
+def filtrar_cobertura_por_diff(
+    arquivo_cobertura: Path,
+    arquivos_modificados: Dict[str, Sequence[Tuple[int, int]]],
+    arquivo_saida: Path
+) -> bool:
+    """
+    Filtra arquivo de cobertura para incluir apenas linhas modificadas.
+    
+    Args:
+        arquivo_cobertura: Arquivo de cobertura original
+        arquivos_modificados: Dict {arquivo: intervalos (inicio, fim) de linhas modificadas}
+        arquivo_saida: Arquivo de saída filtrado
+    
+    Returns:
+        True se filtragem foi bem-sucedida, False caso contrário
+    """
+    if not arquivos_modificados:
+        imprimir_aviso("Nenhum arquivo modificado para filtrar")
         return False
+    
+    filtragem_ok, _ = filtrar_e_resumir_cobertura(arquivo_cobertura, arquivos_modificados, arquivo_saida)
+    return filtragem_ok
 
 
 def extrair_resumo_cobertura(arquivo_cobertura: Path) -> Optional[Dict[str, float]]:
@@ -322,26 +680,14 @@ def extrair_resumo_cobertura(arquivo_cobertura: Path) -> Optional[Dict[str, floa
     try:
         import xml.etree.ElementTree as ET
         
-        tree = ET.parse(arquivo_cobertura)
-        root = tree.getroot()
-        
-        # Extrai métricas do elemento raiz
-        line_rate = float(root.get('line-rate', 0.0))
-        branch_rate = float(root.get('branch-rate', 0.0))
+        # As métricas estão nos atributos da raiz: lê apenas o primeiro evento.
+        # O arquivo é aberto aqui para ser fechado ao sair do laço, sem depender
+        # do coletor de lixo para liberar o iterador interrompido
+        with open(arquivo_cobertura, 'rb') as arquivo:
+            for _, root in ET.iterparse(arquivo, events=('start',)):
+                return _resumo_da_raiz(root.attrib)
         
-        # Conta linhas
-        lines_covered = int(root.get('lines-covered', 0))
-        lines_valid = int(root.get('lines-valid', 0))
-        
-        resumo = {
-            'line_coverage': line_rate * 100,  # Converte para percentual
-            'branch_coverage': branch_rate * 100,
-            'lines_covered': lines_covered,
-            'lines_valid': lines_valid,
-            'lines_uncovered': lines_valid - lines_covered
-        }
-        
-        return resumo
+        return None
     
     except Exception as e:
         imprimir_erro(f"Erro ao extrair resumo de cobertura: {e}")
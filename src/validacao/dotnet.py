@@ -1,19 +1,72 @@
 """Validação e descoberta de projetos .NET."""
 
+import io
+import os
 import re
 import xml.etree.ElementTree as ET
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional, Sequence, Tuple, TypeVar
 from pathlib import Path
 
 from .utilidades import (
     executar_comando,
     imprimir_info,
+    imprimir_info_lista,
     imprimir_sucesso,
     imprimir_erro,
     imprimir_aviso
 )
 
 
+T = TypeVar('T')
+
+# Versão major de um target framework (ex: net8.0 -> 8)
+_RE_VERSAO_FRAMEWORK = re.compile(r'net(\d+)', re.IGNORECASE)
+
+
+# Diretórios que nunca contêm .csproj do repositório (saídas de build,
+# dependências JS, metadados do Git); a busca não desce neles
+_DIRETORIOS_IGNORADOS = frozenset({'bin', 'obj', '.git', 'node_modules'})
+
+
+def _buscar_csproj(caminho_repositorio: Path) -> List[str]:
+    """
+    Percorre o repositório com `os.scandir`, podando `_DIRETORIOS_IGNORADOS`.
+    
+    `DirEntry.is_dir`/`is_file` usam o tipo devolvido pela listagem do
+    diretório, então só os .csproj encontrados custam algo além do `scandir`.
+    Os caminhos ficam como `str` (ordenar strings é bem mais barato que
+    comparar `Path`, que compara parte a parte); `Path` só na fronteira pública.
+    
+    Args:
+        caminho_repositorio: Caminho do repositório
+    
+    Returns:
+        Lista ordenada de caminhos (str) para arquivos .csproj
+    """
+    encontrados = []
+    pendentes = [str(caminho_repositorio)]
+    
+    while pendentes:
+        # Um subdiretório sem permissão de leitura não interrompe a busca
+        try:
+            entradas = os.scandir(pendentes.pop())
+        except OSError:
+            continue
+        
+        with entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    if entrada.name not in _DIRETORIOS_IGNORADOS:
+                        pendentes.append(entrada.path)
+                elif entrada.name.endswith('.csproj') and entrada.is_file():
+                    encontrados.append(entrada.path)
+    
+    encontrados.sort()
+    return encontrados
+
+
 def encontrar_arquivos_csproj(caminho_repositorio: Path) -> List[Path]:
     """
     Encontra todos os arquivos .csproj no repositório.
@@ -27,52 +80,155 @@ def encontrar_arquivos_csproj(caminho_repositorio: Path) -> List[Path]:
     imprimir_info("Procurando arquivos .csproj...")
     
     try:
-        arquivos_csproj = list(caminho_repositorio.rglob('*.csproj'))
+        caminhos = _buscar_csproj(caminho_repositorio)
         
-        if arquivos_csproj:
-            imprimir_sucesso(f"Encontrados {len(arquivos_csproj)} arquivos .csproj")
-            for arquivo in arquivos_csproj:
-                # Mostra caminho relativo ao repositório
-                caminho_relativo = arquivo.relative_to(caminho_repositorio)
-                imprimir_info(f"  • {caminho_relativo}")
+        if caminhos:
+            imprimir_sucesso(f"Encontrados {len(caminhos)} arquivos .csproj")
+            # Mostra caminhos relativos ao repositório, numa única escrita; todos
+            # começam com a raiz, então basta cortar o prefixo
+            prefixo = len(os.path.join(caminho_repositorio, ''))
+            imprimir_info_lista([caminho[prefixo:] for caminho in caminhos])
         else:
             imprimir_aviso("Nenhum arquivo .csproj encontrado no repositório")
         
-        return arquivos_csproj
+        return [Path(caminho) for caminho in caminhos]
     
     except Exception as e:
         imprimir_erro(f"Erro ao procurar arquivos .csproj: {e}")
         return []
 
 
-def obter_target_framework(caminho_csproj: Path) -> Optional[str]:
+def _nome_local(tag: str) -> str:
     """
-    Obtém o TargetFramework de um arquivo .csproj.
+    Nome do elemento sem namespace: .csproj no formato antigo declaram
+    `xmlns=".../msbuild/2003"`, e o ElementTree entrega `{uri}PackageReference`.
+    """
+    return tag.rpartition('}')[2]
+
+
+# Threads para ler vários .csproj ao mesmo tempo (leitura de disco + parse)
+MAX_WORKERS_CSPROJ = 8
+
+
+def _mapear_csproj(funcao: Callable[[Path], T], arquivos_csproj: Sequence[Path]) -> List[T]:
+    """
+    Aplica `funcao` a cada .csproj em um pool de threads, preservando a ordem.
+    
+    Com um único arquivo (ou nenhum) a chamada é direta, sem criar o pool.
+    """
+    if len(arquivos_csproj) <= 1:
+        return [funcao(arquivo) for arquivo in arquivos_csproj]
+    
+    with ThreadPoolExecutor(max_workers=min(len(arquivos_csproj), MAX_WORKERS_CSPROJ)) as executor:
+        return list(executor.map(funcao, arquivos_csproj))
+
+
+# Pacotes cuja referência marca um projeto de teste
+_PACOTES_TESTE = ('xunit', 'nunit', 'mstest', 'microsoft.net.test.sdk')
+_PACOTES_TESTE_BYTES = tuple(pacote.encode('ascii') for pacote in _PACOTES_TESTE)
+
+
+def analisar_csproj(caminho_csproj: Path) -> Tuple[Optional[str], bool]:
+    """
+    Lê um .csproj uma única vez e devolve o TargetFramework e se ele
+    referencia um framework de teste.
+    
+    O resultado é memoizado por (caminho absoluto, mtime, tamanho): um .csproj só é
+    lido de novo se for modificado, então `identificar_projetos_teste` e a
+    coleta de frameworks compartilham o mesmo parse.
     
     Args:
         caminho_csproj: Caminho para o arquivo .csproj
     
     Returns:
-        String do TargetFramework (ex: 'net8.0', 'net6.0') ou None se não encontrado
+        Tupla (target_framework, referencia_pacote_teste); (None, False) se a
+        leitura falhar
     """
     try:
-        tree = ET.parse(caminho_csproj)
-        root = tree.getroot()
-        
-        # Procura por TargetFramework
-        for elem in root.iter('TargetFramework'):
-            return elem.text
+        status = caminho_csproj.stat()
+    except OSError as e:
+        imprimir_aviso(f"Erro ao ler {caminho_csproj.name}: {e}")
+        return None, False
+    
+    # Caminho absoluto na chave: o mesmo .csproj passado como relativo ou
+    # absoluto (por validadores diferentes) reaproveita a mesma entrada
+    return _ler_csproj(os.path.abspath(caminho_csproj), status.st_mtime_ns, status.st_size)
+
+
+@lru_cache(maxsize=4096)
+def _ler_csproj(caminho_csproj: str, mtime_ns: int, tamanho: int) -> Tuple[Optional[str], bool]:
+    """
+    Lê o .csproj em streaming (`iterparse`) e extrai TargetFramework e
+    referências de teste, parando assim que o resultado não puder mudar.
+    
+    Antes do parse, uma busca por substring nos bytes do arquivo descarta a
+    referência de teste quando nenhum nome de pacote de teste aparece (o caso
+    dos projetos de produção): aí o parse termina no <TargetFramework>.
+    
+    Args:
+        caminho_csproj: Caminho para o arquivo .csproj
+        mtime_ns: Data de modificação (parte da chave do cache)
+        tamanho: Tamanho em bytes (parte da chave do cache)
+    
+    Returns:
+        Tupla (target_framework, referencia_pacote_teste)
+    """
+    # <TargetFramework> tem prioridade; <TargetFrameworks> (múltiplos) é o fallback
+    framework = None
+    frameworks_multiplos = None
+    referencia_teste = False
+    
+    try:
+        with open(caminho_csproj, 'rb') as arquivo:
+            dados = arquivo.read()
         
-        # Procura por TargetFrameworks (múltiplos)
-        for elem in root.iter('TargetFrameworks'):
-            frameworks = elem.text.split(';')
-            return frameworks[0] if frameworks else None
+        dados_minusculos = dados.lower()
+        pode_ser_teste = any(pacote in dados_minusculos for pacote in _PACOTES_TESTE_BYTES)
         
-        return None
-    
+        for _, elem in ET.iterparse(io.BytesIO(dados), events=('end',)):
+            tag = _nome_local(elem.tag)
+            if tag == 'TargetFramework':
+                if framework is None:
+                    framework = elem.text
+            elif tag == 'TargetFrameworks':
+                if frameworks_multiplos is None:
+                    frameworks_multiplos = elem.text
+            elif tag == 'PackageReference' and pode_ser_teste and not referencia_teste:
+                # _PACOTES_TESTE já está em minúsculas: só o Include é convertido
+                include = elem.get('Include')
+                if include:
+                    include = include.lower()
+                    referencia_teste = any(pacote in include for pacote in _PACOTES_TESTE)
+            
+            # Nada que venha depois muda o resultado
+            if framework is not None and (referencia_teste or not pode_ser_teste):
+                break
+            
+            # Filhos já processados não são mais necessários
+            elem.clear()
     except Exception as e:
-        imprimir_aviso(f"Erro ao ler {caminho_csproj.name}: {e}")
-        return None
+        imprimir_aviso(f"Erro ao ler {Path(caminho_csproj).name}: {e}")
+        return None, False
+    
+    if framework is None and frameworks_multiplos is not None:
+        frameworks = frameworks_multiplos.split(';')
+        framework = frameworks[0] if frameworks else None
+    
+    return framework, referencia_teste
+
+
+def obter_target_framework(caminho_csproj: Path) -> Optional[str]:
+    """
+    Obtém o TargetFramework de um arquivo .csproj.
+    
+    Args:
+        caminho_csproj: Caminho para o arquivo .csproj
+    
+    Returns:
+        String do TargetFramework (ex: 'net8.0', 'net6.0') ou None se não encontrado
+    """
+    framework, _ = analisar_csproj(caminho_csproj)
+    return framework
 
 
 def eh_projeto_teste(caminho_csproj: Path) -> bool:
@@ -85,26 +241,13 @@ def eh_projeto_teste(caminho_csproj: Path) -> bool:
     Returns:
         True se for projeto de teste, False caso contrário
     """
-    try:
-        # Verifica o nome do projeto
-        if 'test' in caminho_csproj.name.lower():
-            return True
-        
-        # Verifica referências a frameworks de teste no XML
-        tree = ET.parse(caminho_csproj)
-        root = tree.getroot()
-        
-        test_packages = ['xunit', 'nunit', 'mstest', 'Microsoft.NET.Test.Sdk']
-        for elem in root.iter('PackageReference'):
-            include = elem.get('Include', '')
-            if any(pkg.lower() in include.lower() for pkg in test_packages):
-                return True
-        
-        return False
+    # Verifica o nome do projeto
+    if 'test' in caminho_csproj.name.lower():
+        return True
     
-    except Exception as e:
-        imprimir_aviso(f"Erro ao verificar projeto de teste {caminho_csproj.name}: {e}")
-        return False
+    # Verifica referências a frameworks de teste no XML
+    _, referencia_teste = analisar_csproj(caminho_csproj)
+    return referencia_teste
 
 
 def identificar_projetos_teste(arquivos_csproj: List[Path]) -> List[Path]:
@@ -119,44 +262,93 @@ def identificar_projetos_teste(arquivos_csproj: List[Path]) -> List[Path]:
     """
     imprimir_info("Identificando projetos de teste...")
     
-    projetos_teste = [proj for proj in arquivos_csproj if eh_projeto_teste(proj)]
+    # Um parse de XML por projeto, em paralelo
+    projetos_teste = [
+        proj
+        for proj, eh_teste in zip(arquivos_csproj, _mapear_csproj(eh_projeto_teste, arquivos_csproj))
+        if eh_teste
+    ]
     
     if projetos_teste:
         imprimir_sucesso(f"Encontrados {len(projetos_teste)} projetos de teste")
-        for proj in projetos_teste:
-            imprimir_info(f"  • {proj.name}")
+        imprimir_info_lista([proj.name for proj in projetos_teste])
     else:
         imprimir_aviso("Nenhum projeto de teste encontrado")
     
     return projetos_teste
 
 
-def verificar_dotnet_instalado() -> bool:
+@lru_cache(maxsize=8)
+def _consultar_dotnet(argumentos: Tuple[str, ...], path: Optional[str], diretorio: str) -> Tuple[int, str]:
     """
-    Verifica se o comando dotnet está disponível.
+    Executa `dotnet <argumentos>` uma única vez por processo (até
+    `invalidar_cache`).
+    
+    A chave inclui PATH e o diretório atual: outro PATH pode apontar para outro
+    dotnet, e um `global.json` no diretório muda o SDK ativo.
+    
+    Args:
+        argumentos: Argumentos do dotnet (ex: ('--version',), ('tool', 'list', '-g'))
+        path: Valor de PATH (parte da chave do cache)
+        diretorio: Diretório atual (parte da chave do cache)
     
     Returns:
-        True se dotnet está instalado, False caso contrário
+        Tupla (código de saída, stdout)
+    """
+    resultado = executar_comando(['dotnet', *argumentos], verificar=False, capturar_stderr=False)
+    return resultado.returncode, resultado.stdout
+
+
+def _executar_dotnet(*argumentos: str) -> Tuple[int, str]:
+    """Consulta o dotnet com o cache de `_consultar_dotnet` para o ambiente atual."""
+    return _consultar_dotnet(argumentos, os.environ.get('PATH'), os.getcwd())
+
+
+def invalidar_cache():
+    """
+    Descarta os resultados memoizados deste módulo (consultas ao dotnet e
+    leitura de .csproj), para quando o ambiente muda durante a execução.
+    """
+    _consultar_dotnet.cache_clear()
+    _ler_csproj.cache_clear()
+
+
+def obter_versao_dotnet() -> Optional[str]:
+    """
+    Obtém a versão do .NET SDK ativo (`dotnet --version`).
+    
+    Returns:
+        Versão do SDK ou None se o dotnet não estiver disponível
     """
     imprimir_info("Verificando instalação do .NET SDK...")
     
     try:
-        resultado = executar_comando(['dotnet', '--version'], verificar=False)
+        codigo, saida = _executar_dotnet('--version')
         
-        if resultado.returncode == 0:
-            versao = resultado.stdout.strip()
+        if codigo == 0:
+            versao = saida.strip()
             imprimir_sucesso(f".NET SDK instalado: versão {versao}")
-            return True
+            return versao
         else:
             imprimir_erro(".NET SDK não encontrado")
-            return False
+            return None
     
     except FileNotFoundError:
         imprimir_erro(".NET SDK não está instalado ou não está no PATH")
-        return False
+        return None
     except Exception as e:
         imprimir_erro(f"Erro ao verificar .NET SDK: {e}")
-        return False
+        return None
+
+
+def verificar_dotnet_instalado() -> bool:
+    """
+    Verifica se o comando dotnet está disponível.
+    
+    Returns:
+        True se dotnet está instalado, False caso contrário
+    """
+    return obter_versao_dotnet() is not None
 
 
 def listar_sdks_instalados() -> List[str]:
@@ -169,23 +361,23 @@ def listar_sdks_instalados() -> List[str]:
     imprimir_info("Listando SDKs do .NET instalados...")
     
     try:
-        resultado = executar_comando(['dotnet', '--list-sdks'], verificar=False)
+        codigo, saida = _executar_dotnet('--list-sdks')
         
-        if resultado.returncode != 0:
+        if codigo != 0:
             imprimir_erro("Falha ao listar SDKs")
             return []
         
         sdks = []
-        for linha in resultado.stdout.split('\n'):
+        for linha in saida.split('\n'):
             if linha.strip():
-                # Formato: "8.0.100 [C:\Program Files\dotnet\sdk]"
-                versao = linha.split()[0]
+                # Formato: "8.0.100 [C:\Program Files\dotnet\sdk]"; só a
+                # versão interessa, o caminho (com espaços) não é dividido
+                versao = linha.split(maxsplit=1)[0]
                 sdks.append(versao)
         
         if sdks:
             imprimir_sucesso(f"Encontrados {len(sdks)} SDKs instalados:")
-            for sdk in sdks:
-                imprimir_info(f"  • {sdk}")
+            imprimir_info_lista(sdks)
         else:
             imprimir_aviso("Nenhum SDK encontrado")
         
@@ -198,7 +390,8 @@ def listar_sdks_instalados() -> List[str]:
 
 def verificar_sdks_necessarios(
     arquivos_csproj: List[Path],
-    sdks_instalados: List[str]
+    sdks_instalados: List[str],
+    frameworks_necessarios: Optional[Iterable[str]] = None
 ) -> Tuple[bool, List[str]]:
     """
     Verifica se todos os SDKs necessários estão instalados.
@@ -206,18 +399,21 @@ def verificar_sdks_necessarios(
     Args:
         arquivos_csproj: Lista de arquivos .csproj
         sdks_instalados: Lista de SDKs instalados
+        frameworks_necessarios: Frameworks já coletados dos .csproj (opcional);
+            se omitido, cada .csproj é lido aqui
     
     Returns:
         Tupla (todos_ok, frameworks_faltando)
     """
     imprimir_info("Verificando SDKs necessários...")
     
-    # Coleta todos os frameworks necessários
-    frameworks_necessarios = set()
-    for csproj in arquivos_csproj:
-        framework = obter_target_framework(csproj)
-        if framework:
-            frameworks_necessarios.add(framework)
+    # Coleta todos os frameworks necessários (se ainda não foram coletados)
+    if frameworks_necessarios is None:
+        frameworks_necessarios = {
+            framework
+            for framework in _mapear_csproj(obter_target_framework, arquivos_csproj)
+            if framework
+        }
     
     if not frameworks_necessarios:
         imprimir_aviso("Nenhum framework foi detectado nos arquivos .csproj")
@@ -229,9 +425,8 @@ def verificar_sdks_necessarios(
     sdks_majors = set()
     for sdk in sdks_instalados:
         try:
-            major = int(sdk.split('.')[0])
-            sdks_majors.add(major)
-        except (ValueError, IndexError):
+            sdks_majors.add(int(sdk.partition('.')[0]))
+        except ValueError:
             continue
     
     imprimir_info(f"SDKs instalados (versões major): {sorted(sdks_majors)}")
@@ -240,7 +435,7 @@ def verificar_sdks_necessarios(
     frameworks_faltando = []
     for framework in frameworks_necessarios:
         # Extrai versão major do framework (ex: net8.0 -> 8)
-        match = re.search(r'net(\d+)', framework.lower())
+        match = _RE_VERSAO_FRAMEWORK.search(framework)
         if match:
             framework_major = int(match.group(1))
             
@@ -275,20 +470,21 @@ def verificar_reportgenerator_instalado() -> bool:
     imprimir_info("Verificando instalação do ReportGenerator...")
     
     try:
-        resultado = executar_comando(['dotnet', 'tool', 'list', '-g'], verificar=False)
+        codigo, saida = _executar_dotnet('tool', 'list', '-g')
         
-        if resultado.returncode != 0:
+        if codigo != 0:
             imprimir_erro("Falha ao listar ferramentas globais do .NET")
             return False
         
         # Procura por reportgenerator na lista de ferramentas
-        is_installed = 'reportgenerator' in resultado.stdout.lower()
+        is_installed = 'reportgenerator' in saida.lower()
         
         if is_installed:
             # Tenta extrair a versão
-            for linha in resultado.stdout.split('\n'):
+            for linha in saida.split('\n'):
                 if 'reportgenerator' in linha.lower():
-                    partes = linha.split()
+                    # Formato: "<id do pacote> <versão> <comandos>"
+                    partes = linha.split(maxsplit=2)
                     if len(partes) >= 2:
                         versao = partes[1]
                         imprimir_sucesso(f"ReportGenerator está instalado: versão {versao}")
@@ -318,6 +514,8 @@ def instalar_reportgenerator() -> bool:
             ['dotnet', 'tool', 'install', '-g', 'dotnet-reportgenerator-globaltool'],
             verificar=False
         )
+        # A lista de ferramentas globais memoizada deixa de valer
+        _consultar_dotnet.cache_clear()
         
         if resultado.returncode == 0:
             imprimir_sucesso("ReportGenerator instalado com sucesso")
@@ -352,6 +550,7 @@ def atualizar_reportgenerator() -> bool:
             ['dotnet', 'tool', 'update', '-g', 'dotnet-reportgenerator-globaltool'],
             verificar=False
         )
+        _consultar_dotnet.cache_clear()
         
         if resultado.returncode == 0:
             imprimir_sucesso("ReportGenerator atualizado com sucesso")
@@ -379,20 +578,23 @@ def detectar_tipo_coverlet(caminho_csproj: Path) -> Optional[str]:
         None em caso de erro
     """
     try:
-        tree = ET.parse(caminho_csproj)
-        root = tree.getroot()
-        
         has_collector = False
         has_msbuild = False
         
-        for elem in root.iter('PackageReference'):
-            include = elem.get('Include', '') or ''
-            include_lower = include.lower()
-            
-            if 'coverlet.collector' in include_lower:
-                has_collector = True
-            if 'coverlet.msbuild' in include_lower:
-                has_msbuild = True
+        # Leitura em streaming: o collector é o preferido, então ao encontrá-lo
+        # o restante do arquivo não muda o resultado
+        with open(caminho_csproj, 'rb') as arquivo:
+            for _, elem in ET.iterparse(arquivo, events=('end',)):
+                if _nome_local(elem.tag) == 'PackageReference':
+                    include_lower = (elem.get('Include', '') or '').lower()
+                    
+                    if 'coverlet.collector' in include_lower:
+                        has_collector = True
+                        break
+                    if 'coverlet.msbuild' in include_lower:
+                        has_msbuild = True
+                
+                elem.clear()
         
         # Preferimos o collector quando ambos estão presentes
         if has_collector:
@@ -430,9 +632,10 @@ def verificar_coverlet_projetos(projetos_teste: List[Path]) -> Tuple[bool, List[
     projetos_sem_coverlet = []
     tipos_coverlet = {}
     
-    for projeto in projetos_teste:
-        tipo = detectar_tipo_coverlet(projeto)
-        
+    # Um parse de XML por projeto, em paralelo
+    tipos_detectados = _mapear_csproj(detectar_tipo_coverlet, projetos_teste)
+    
+    for projeto, tipo in zip(projetos_teste, tipos_detectados):
         if tipo == 'none' or tipo is None:
             projetos_sem_coverlet.append(projeto)
             imprimir_aviso(f"  ✗ {projeto.name}: Coverlet não encontrado")
@@ -1,11 +1,63 @@
 """Validação de repositório Git."""
 
+import os
 import re
-from typing import Optional, Dict, Set
+import subprocess
+import sys
+from bisect import bisect_right
+from typing import Any, Optional, Dict, List, Tuple
 from pathlib import Path
 from collections import defaultdict
+from functools import lru_cache
+from itertools import islice
 
-from .utilidades import executar_comando, imprimir_info, imprimir_sucesso, imprimir_erro, imprimir_aviso
+from .cache import carregar_diff_cache, salvar_diff_cache
+from .utilidades import (
+    executar_comando,
+    executar_comando_stream,
+    imprimir_info,
+    imprimir_info_lote,
+    imprimir_sucesso,
+    imprimir_erro,
+    imprimir_aviso
+)
+
+
+# Prefixo de todas as chamadas ao git: sem locks opcionais (não disputa o
+# index com outras ferramentas) e sem `gc --auto` disparado pelas sondagens
+GIT_BASE_ARGS = ['git', '--no-optional-locks', '-c', 'gc.auto=0']
+
+# Parte "+new_start,new_count" do cabeçalho de um hunk (@@ -a,b +c,d @@);
+# aplicado à saída do diff em bytes
+_RE_HUNK_NOVO = re.compile(rb'\+(\d+)(?:,(\d+))?')
+
+
+@lru_cache(maxsize=32)
+def _consultar_git(argumentos: Tuple[str, ...], caminho: str) -> Tuple[int, str]:
+    """
+    Executa uma consulta somente leitura ao git uma única vez por processo
+    (até `invalidar_cache`).
+    
+    Args:
+        argumentos: Argumentos do git (após `GIT_BASE_ARGS`)
+        caminho: Caminho resolvido do repositório (parte da chave do cache)
+    
+    Returns:
+        Tupla (código de saída, stdout)
+    """
+    # Nenhuma consulta usa o stderr (só o código de saída e o stdout)
+    resultado = executar_comando(
+        [*GIT_BASE_ARGS, *argumentos],
+        diretorio=Path(caminho),
+        verificar=False,
+        capturar_stderr=False
+    )
+    return resultado.returncode, resultado.stdout
+
+
+def invalidar_cache():
+    """Descarta as consultas ao git memoizadas (ex: após um checkout)."""
+    _consultar_git.cache_clear()
 
 
 def verificar_repositorio_git(caminho: Path) -> bool:
@@ -21,12 +73,8 @@ def verificar_repositorio_git(caminho: Path) -> bool:
     imprimir_info(f"Verificando se '{caminho}' é um repositório Git...")
     
     try:
-        resultado = executar_comando(
-            ['git', 'rev-parse', '--git-dir'],
-            diretorio=caminho,
-            verificar=False
-        )
-        eh_repositorio = resultado.returncode == 0
+        codigo, _ = _consultar_git(('rev-parse', '--git-dir'), str(Path(caminho).resolve()))
+        eh_repositorio = codigo == 0
         
         if eh_repositorio:
             imprimir_sucesso("Repositório Git válido detectado")
@@ -55,24 +103,56 @@ def detectar_branch_base(caminho_repositorio: Path) -> Optional[str]:
     imprimir_info("Detectando branch base...")
     
     try:
-        # Atualiza as refs remotas
-        executar_comando(['git', 'fetch', '--all'], diretorio=caminho_repositorio, verificar=False)
-        
-        # Lista de branches comuns para tentar
-        candidatas = ['origin/main', 'origin/master', 'main', 'master']
+        # Candidatas em ordem de preferência: {nome: ref completa}
+        candidatas = {
+            'origin/main': 'refs/remotes/origin/main',
+            'origin/master': 'refs/remotes/origin/master',
+            'main': 'refs/heads/main',
+            'master': 'refs/heads/master'
+        }
         
-        for branch in candidatas:
+        def refs_existentes(refs: List[str]) -> set:
+            # Um único `for-each-ref` responde por todas as refs de uma vez
             resultado = executar_comando(
-                ['git', 'rev-parse', '--verify', branch],
+                [*GIT_BASE_ARGS, 'for-each-ref', '--format=%(refname)', *refs],
                 diretorio=caminho_repositorio,
                 verificar=False
             )
-            if resultado.returncode == 0:
+            return set(resultado.stdout.split()) if resultado.returncode == 0 else set()
+        
+        # Atualiza as refs remotas em segundo plano (operação de rede); as
+        # sondagens locais abaixo rodam enquanto isso
+        fetch = subprocess.Popen(
+            [*GIT_BASE_ARGS, 'fetch', '--all'],
+            cwd=caminho_repositorio,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        
+        try:
+            # O fetch não altera branches locais: elas são sondadas durante o fetch
+            existentes = refs_existentes([ref for ref in candidatas.values() if ref.startswith('refs/heads/')])
+            
+            # As refs remotas só são sondadas depois do fetch (ele pode criá-las
+            # ou removê-las), e a branch devolvida já aponta para o commit atualizado
+            fetch.wait()
+            existentes |= refs_existentes([ref for ref in candidatas.values() if ref.startswith('refs/remotes/')])
+        finally:
+            # Erro antes do fim do fetch: não deixa o processo órfão
+            if fetch.poll() is None:
+                fetch.kill()
+                fetch.wait()
+        
+        for branch, ref in candidatas.items():
+            if ref in existentes:
                 imprimir_sucesso(f"Branch base detectada: {branch}")
                 return branch
         
         imprimir_aviso("Nenhuma branch base padrão encontrada")
         return None
+    except FileNotFoundError:
+        imprimir_erro("Git não está instalado ou não está no PATH")
+        return None
     except Exception as e:
         imprimir_erro(f"Erro ao detectar branch base: {e}")
         return None
@@ -88,90 +168,310 @@ def obter_branch_atual(caminho_repositorio: Path) -> Optional[str]:
     Returns:
         Nome da branch atual ou None em caso de erro
     """
+    try:
+        caminho = str(Path(caminho_repositorio).resolve())
+        
+        # `symbolic-ref` só lê a referência de HEAD, sem resolver commits
+        codigo, saida = _consultar_git(('symbolic-ref', '--short', '-q', 'HEAD'), caminho)
+        if codigo == 0:
+            return saida.strip()
+        
+        # HEAD destacado: mantém o retorno anterior ('HEAD')
+        codigo, saida = _consultar_git(('rev-parse', '--abbrev-ref', 'HEAD'), caminho)
+        if codigo == 0:
+            return saida.strip()
+        return None
+    except Exception:
+        return None
+
+
+# Intervalos fechados (inicio, fim) de linhas modificadas
+Intervalo = Tuple[int, int]
+# Intervalos de um arquivo: tupla imutável, compartilhada sem cópia entre o
+# cache de diffs e os estados do grafo (nenhum consumidor consegue alterá-la)
+Intervalos = Tuple[Intervalo, ...]
+
+# Diffs já calculados nesta execução: {(sha_base, sha_head): {arquivo: intervalos}}
+_cache_diff: Dict[Tuple[str, str], Dict[str, Intervalos]] = {}
+
+
+def _mesclar_intervalos(intervalos: List[Intervalo]) -> Intervalos:
+    """Ordena os intervalos e une os que se sobrepõem ou são adjacentes."""
+    mesclados: List[Intervalo] = []
+    for inicio, fim in sorted(intervalos):
+        if mesclados and inicio <= mesclados[-1][1] + 1:
+            if fim > mesclados[-1][1]:
+                mesclados[-1] = (mesclados[-1][0], fim)
+        else:
+            mesclados.append((inicio, fim))
+    return tuple(mesclados)
+
+
+def contar_linhas_modificadas(intervalos: Intervalos) -> int:
+    """
+    Conta as linhas cobertas por uma lista de intervalos disjuntos.
+    
+    Args:
+        intervalos: Intervalos fechados (inicio, fim)
+    
+    Returns:
+        Número total de linhas
+    """
+    return sum(fim - inicio + 1 for inicio, fim in intervalos)
+
+
+def linha_modificada(intervalos: Intervalos, numero_linha: int) -> bool:
+    """
+    Verifica, por busca binária, se a linha está em um dos intervalos.
+    
+    Args:
+        intervalos: Intervalos fechados (inicio, fim), ordenados e disjuntos
+        numero_linha: Número da linha
+    
+    Returns:
+        True se a linha pertence a algum intervalo
+    """
+    # Último intervalo cujo início é <= numero_linha
+    posicao = bisect_right(intervalos, (numero_linha, sys.maxsize)) - 1
+    return posicao >= 0 and intervalos[posicao][1] >= numero_linha
+
+
+def resolver_shas(caminho_repositorio: Path, *refs: str) -> Optional[Tuple[str, ...]]:
+    """
+    Resolve referências Git (branches, HEAD) para SHAs de commit em uma única chamada.
+    
+    Args:
+        caminho_repositorio: Caminho do repositório Git
+        refs: Referências a resolver
+    
+    Returns:
+        Tupla com os SHAs, na ordem das referências, ou None em caso de erro
+    """
     try:
         resultado = executar_comando(
-            ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+            [*GIT_BASE_ARGS, 'rev-parse', *refs],
             diretorio=caminho_repositorio,
             verificar=False
         )
-        if resultado.returncode == 0:
-            return resultado.stdout.strip()
+        shas = tuple(resultado.stdout.split())
+        if resultado.returncode == 0 and len(shas) == len(refs):
+            return shas
         return None
     except Exception:
         return None
 
 
-def obter_arquivos_e_linhas_modificadas(
+def _calcular_diff(
+    caminho_repositorio: Path,
+    branch_base: str,
+    extensoes: Optional[Tuple[str, ...]]
+) -> Dict[str, Intervalos]:
+    """Executa `git diff` e converte os hunks em intervalos de linhas por arquivo."""
+    # Executa git diff com -U0 para obter apenas as linhas modificadas, sem
+    # detecção de renomeações nem diff externo configurado pelo usuário
+    # A saída é consumida enquanto o git a produz, sem ficar inteira na memória
+    saida = executar_comando_stream(
+        [*GIT_BASE_ARGS, 'diff', '--no-renames', '--no-ext-diff', '-U0', branch_base, 'HEAD'],
+        diretorio=caminho_repositorio
+    )
+    
+    intervalos_modificados = defaultdict(list)
+    arquivo_atual = None
+    
+    # Parse do output do git diff em bytes: o conteúdo das linhas (a maior
+    # parte da saída) nunca é decodificado, só os nomes de arquivo
+    for linha in saida:
+        # Detecta o início de um novo arquivo
+        # Formato: +++ b/caminho/do/arquivo.cs
+        if linha.startswith(b'+++'):
+            caminho_arquivo = linha[6:].strip().decode('utf-8', 'replace')  # Remove '+++ b/'
+            if caminho_arquivo and caminho_arquivo != '/dev/null':
+                # Arquivos fora das extensões pedidas não acumulam linhas
+                if extensoes is None or caminho_arquivo.endswith(extensoes):
+                    arquivo_atual = caminho_arquivo
+                else:
+                    arquivo_atual = None
+        
+        # Detecta as linhas modificadas
+        # Formato: @@ -old_start,old_count +new_start,new_count @@
+        elif linha.startswith(b'@@') and arquivo_atual:
+            # Extrai a parte +new_start,new_count: no formato padrão é o
+            # terceiro campo, separado com métodos de bytes (sem o motor de
+            # regex); o regex fica para cabeçalhos fora desse formato
+            campos = linha.split(b' ', 3)
+            if len(campos) > 2 and campos[2].startswith(b'+'):
+                inicio, _, contagem = campos[2][1:].partition(b',')
+            else:
+                match = _RE_HUNK_NOVO.search(linha)
+                if not match:
+                    continue
+                inicio, contagem = match.groups()
+            
+            if inicio:
+                linha_inicial = int(inicio)
+                # Se não houver count, assume 1 linha
+                quantidade = int(contagem) if contagem else 1
+                
+                # O hunk já é um intervalo contíguo (count 0 = apenas remoção)
+                if quantidade > 0:
+                    intervalos_modificados[arquivo_atual].append(
+                        (linha_inicial, linha_inicial + quantidade - 1)
+                    )
+    
+    # Converte para dict normal com intervalos ordenados e coalescidos
+    return {
+        arquivo: _mesclar_intervalos(intervalos)
+        for arquivo, intervalos in intervalos_modificados.items()
+    }
+
+
+def obter_diff_por_extensao(
     caminho_repositorio: Path,
-    branch_base: str
-) -> Dict[str, Set[int]]:
+    branch_base: str,
+    extensoes: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Any]:
     """
-    Obtém arquivos modificados e os números de linhas alteradas/adicionadas.
-    Calcula o diff entre a branch base e HEAD.
+    Obtém arquivos modificados e os intervalos de linhas alteradas/adicionadas,
+    já agrupados por extensão. Calcula o diff entre a branch base e HEAD.
+    
+    As linhas de cada arquivo são devolvidas como intervalos fechados
+    (inicio, fim), ordenados e disjuntos, um por trecho contíguo do diff:
+    a memória cresce com o número de hunks, não de linhas. Testes de
+    pertinência devem usar busca binária (`bisect`) sobre os intervalos.
+    
+    O diff completo é cacheado pelos SHAs (base, HEAD), em memória e em disco:
+    como os dois commits são imutáveis, o `git diff` só roda quando um deles muda.
     
     Args:
         caminho_repositorio: Caminho do repositório Git
         branch_base: Branch base para comparação (ex: 'origin/main', 'main')
+        extensoes: Se informado, apenas arquivos com essas extensões (ex: ('.cs',))
+            são materializados; os hunks dos demais são ignorados já no parse
     
     Returns:
-        Dicionário {caminho_arquivo: set(números_de_linhas)}
-        Exemplo: {'src/MyClass.cs': {10, 11, 12, 25}, 'src/Other.cs': {5, 6}}
+        Dict com:
+        - total: {caminho_arquivo: ((inicio, fim), ...)} com todos os arquivos
+        - por_extensao: {extensão: {caminho_arquivo: intervalos}} (ex: '.cs')
+        - total_linhas: número total de linhas modificadas
+        Exemplo de 'total': {'src/MyClass.cs': ((10, 12), (25, 25)), 'src/Other.cs': ((5, 6),)}
     """
     imprimir_info(f"Calculando diff entre HEAD e {branch_base}...")
     
     try:
-        # Executa git diff com --unified=0 para obter apenas as linhas modificadas
-        resultado = executar_comando(
-            ['git', 'diff', branch_base, 'HEAD', '--unified=0'],
-            diretorio=caminho_repositorio,
-            verificar=True
-        )
+        shas = resolver_shas(caminho_repositorio, branch_base, 'HEAD')
         
-        linhas_modificadas = defaultdict(set)
-        arquivo_atual = None
+        resultado_dict = _cache_diff.get(shas) if shas else None
+        if resultado_dict is None and shas:
+            diff_salvo = carregar_diff_cache(*shas)
+            if diff_salvo is not None:
+                resultado_dict = {
+                    arquivo: tuple((inicio, fim) for inicio, fim in intervalos)
+                    for arquivo, intervalos in diff_salvo.items()
+                }
+                _cache_diff[shas] = resultado_dict
         
-        # Parse do output do git diff
-        for linha in resultado.stdout.split('\n'):
-            # Detecta o início de um novo arquivo
-            # Formato: +++ b/caminho/do/arquivo.cs
-            if linha.startswith('+++'):
-                caminho_arquivo = linha[6:].strip()  # Remove '+++ b/'
-                if caminho_arquivo and caminho_arquivo != '/dev/null':
-                    arquivo_atual = caminho_arquivo
-            
-            # Detecta as linhas modificadas
-            # Formato: @@ -old_start,old_count +new_start,new_count @@
-            elif linha.startswith('@@') and arquivo_atual:
-                # Extrai a parte +new_start,new_count
-                match = re.search(r'\+(\d+)(?:,(\d+))?', linha)
-                if match:
-                    linha_inicial = int(match.group(1))
-                    # Se não houver count, assume 1 linha
-                    quantidade = int(match.group(2)) if match.group(2) else 1
-                    
-                    # Adiciona todas as linhas do intervalo ao conjunto
-                    for num_linha in range(linha_inicial, linha_inicial + quantidade):
-                        linhas_modificadas[arquivo_atual].add(num_linha)
-        
-        # Converte defaultdict para dict normal
-        resultado_dict = dict(linhas_modificadas)
+        if resultado_dict is not None:
+            imprimir_info("Diff reaproveitado do cache")
+            if extensoes is not None:
+                resultado_dict = {
+                    arquivo: linhas
+                    for arquivo, linhas in resultado_dict.items()
+                    if arquivo.endswith(extensoes)
+                }
+        else:
+            resultado_dict = _calcular_diff(caminho_repositorio, branch_base, extensoes)
+            # Apenas o diff completo é cacheado; um filtrado não serve para outras extensões
+            if shas and extensoes is None:
+                _cache_diff[shas] = resultado_dict
+                salvar_diff_cache(*shas, resultado_dict)
+        
+        # Uma passada: agrupa por extensão e soma as linhas modificadas
+        por_extensao = defaultdict(dict)
+        total_linhas = 0
+        for arquivo, intervalos in resultado_dict.items():
+            por_extensao[os.path.splitext(arquivo)[1]][arquivo] = intervalos
+            total_linhas += contar_linhas_modificadas(intervalos)
         
         # Exibe resumo
         total_arquivos = len(resultado_dict)
-        total_linhas = sum(len(linhas) for linhas in resultado_dict.values())
         
         imprimir_sucesso(f"Encontrados {total_arquivos} arquivos modificados com {total_linhas} linhas alteradas")
         
-        # Mostra os primeiros 5 arquivos como preview
-        for i, (arquivo, linhas) in enumerate(list(resultado_dict.items())[:5]):
-            imprimir_info(f"  • {arquivo}: {len(linhas)} linhas modificadas")
-        
+        # Mostra os primeiros 5 arquivos como preview (uma única escrita)
+        preview = [
+            f"  • {arquivo}: {contar_linhas_modificadas(intervalos)} linhas modificadas"
+            for arquivo, intervalos in islice(resultado_dict.items(), 5)
+        ]
         if total_arquivos > 5:
-            imprimir_info(f"  ... e mais {total_arquivos - 5} arquivos")
+            preview.append(f"  ... e mais {total_arquivos - 5} arquivos")
+        imprimir_info_lote(preview)
         
-        return resultado_dict
+        return {
+            "total": resultado_dict,
+            "por_extensao": dict(por_extensao),
+            "total_linhas": total_linhas
+        }
     
     except Exception as e:
         imprimir_erro(f"Erro ao calcular diff: {e}")
-        return {}
+        return {"total": {}, "por_extensao": {}, "total_linhas": 0}
 
+
+def obter_arquivos_e_linhas_modificadas(
+    caminho_repositorio: Path,
+    branch_base: str,
+    extensoes: Optional[Tuple[str, ...]] = None
+) -> Dict[str, Intervalos]:
+    """
+    Obtém arquivos modificados e os intervalos de linhas alteradas/adicionadas.
+    
+    Versão sem agrupamento de `obter_diff_por_extensao`.
+    
+    Args:
+        caminho_repositorio: Caminho do repositório Git
+        branch_base: Branch base para comparação (ex: 'origin/main', 'main')
+        extensoes: Filtro opcional de extensões (ex: ('.cs',))
+    
+    Returns:
+        Dicionário {caminho_arquivo: ((inicio, fim), ...)}
+    """
+    return obter_diff_por_extensao(caminho_repositorio, branch_base, extensoes)["total"]
+
+
+def obter_arquivos_modificados(
+    caminho_repositorio: Path,
+    branch_base: str,
+    extensoes: Optional[Tuple[str, ...]] = None
+) -> List[str]:
+    """
+    Lista os arquivos modificados entre a branch base e HEAD, sem as linhas.
+    
+    Para quem só precisa dos nomes: `git diff --name-only` não gera hunks, e
+    nada é parseado linha a linha. Arquivos removidos ficam de fora, como em
+    `obter_arquivos_e_linhas_modificadas`; já um arquivo que só teve linhas
+    removidas aparece aqui, mas não lá (não há linhas novas a cobrir).
+    
+    Args:
+        caminho_repositorio: Caminho do repositório Git
+        branch_base: Branch base para comparação (ex: 'origin/main', 'main')
+        extensoes: Filtro opcional de extensões (ex: ('.cs',))
+    
+    Returns:
+        Lista de caminhos de arquivos (vazia em caso de erro)
+    """
+    try:
+        resultado = executar_comando(
+            [*GIT_BASE_ARGS, 'diff', '--name-only', '--no-renames', '--no-ext-diff',
+             '--diff-filter=d', branch_base, 'HEAD'],
+            diretorio=caminho_repositorio,
+            verificar=True
+        )
+    except Exception as e:
+        imprimir_erro(f"Erro ao listar arquivos modificados: {e}")
+        return []
+    
+    return [
+        arquivo
+        for arquivo in resultado.stdout.splitlines()
+        if arquivo and (extensoes is None or arquivo.endswith(extensoes))
+    ]
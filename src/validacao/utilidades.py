@@ -1,11 +1,34 @@
 """Utilitários para validação e execução de comandos."""
 
+import os
 import sys
 import subprocess
-from typing import List, Optional
+import threading
+from typing import Iterable, Iterator, List, Optional, Sequence
 from pathlib import Path
 
 
+# Listagens completas (um item por linha) só com COVER_CHECK_VERBOSE=1; sem
+# ela, listas longas são resumidas aos primeiros LIMITE_LISTAGEM itens
+VERBOSO = os.environ.get("COVER_CHECK_VERBOSE", "0") == "1"
+LIMITE_LISTAGEM = 10
+
+# Serializa a escrita no console quando várias threads imprimem ao mesmo tempo
+_trava_saida = threading.Lock()
+
+# Herdado por todos os processos filhos (dotnet, reportgenerator): sem envio
+# de telemetria nem banner de primeira execução a cada chamada. Valores já
+# definidos pelo usuário são respeitados.
+os.environ.setdefault("DOTNET_CLI_TELEMETRY_OPTOUT", "1")
+os.environ.setdefault("DOTNET_NOLOGO", "1")
+os.environ.setdefault("DOTNET_SKIP_FIRST_TIME_EXPERIENCE", "1")
+# Servidor do MSBuild (.NET 7+) e reuso de nós: o primeiro build sobe um
+# processo persistente, e os builds/testes seguintes o reaproveitam já
+# compilado pelo JIT, em vez de inicializar o MSBuild do zero a cada projeto
+os.environ.setdefault("DOTNET_CLI_USE_MSBUILD_SERVER", "1")
+os.environ.setdefault("MSBUILDDISABLENODEREUSE", "0")
+
+
 class Cores:
     """Cores ANSI para output no console."""
     HEADER = '\033[95m'
@@ -20,35 +43,65 @@ class Cores:
 
 def imprimir_cabecalho(mensagem: str):
     """Imprime um cabeçalho formatado."""
-    print(f"\n{Cores.HEADER}{Cores.BOLD}{'=' * 80}{Cores.ENDC}")
-    print(f"{Cores.HEADER}{Cores.BOLD}{mensagem.center(80)}{Cores.ENDC}")
-    print(f"{Cores.HEADER}{Cores.BOLD}{'=' * 80}{Cores.ENDC}\n")
+    with _trava_saida:
+        print(f"\n{Cores.HEADER}{Cores.BOLD}{'=' * 80}{Cores.ENDC}")
+        print(f"{Cores.HEADER}{Cores.BOLD}{mensagem.center(80)}{Cores.ENDC}")
+        print(f"{Cores.HEADER}{Cores.BOLD}{'=' * 80}{Cores.ENDC}\n")
 
 
 def imprimir_sucesso(mensagem: str):
     """Imprime mensagem de sucesso."""
-    print(f"{Cores.OKGREEN}✓ {mensagem}{Cores.ENDC}")
+    with _trava_saida:
+        print(f"{Cores.OKGREEN}✓ {mensagem}{Cores.ENDC}")
 
 
 def imprimir_erro(mensagem: str):
     """Imprime mensagem de erro."""
-    print(f"{Cores.FAIL}✗ {mensagem}{Cores.ENDC}", file=sys.stderr)
+    with _trava_saida:
+        print(f"{Cores.FAIL}✗ {mensagem}{Cores.ENDC}", file=sys.stderr)
 
 
 def imprimir_aviso(mensagem: str):
     """Imprime mensagem de aviso."""
-    print(f"{Cores.WARNING}⚠ {mensagem}{Cores.ENDC}")
+    with _trava_saida:
+        print(f"{Cores.WARNING}⚠ {mensagem}{Cores.ENDC}")
 
 
 def imprimir_info(mensagem: str):
     """Imprime mensagem informativa."""
-    print(f"{Cores.OKBLUE}ℹ {mensagem}{Cores.ENDC}")
+    with _trava_saida:
+        print(f"{Cores.OKBLUE}ℹ {mensagem}{Cores.ENDC}")
+
+
+def imprimir_info_lote(mensagens: Iterable[str]):
+    """Imprime várias mensagens informativas com uma única escrita no console."""
+    texto = "\n".join(f"{Cores.OKBLUE}ℹ {mensagem}{Cores.ENDC}" for mensagem in mensagens)
+    if texto:
+        with _trava_saida:
+            print(texto)
+
+
+def imprimir_info_lista(itens: Sequence[str], limite: int = LIMITE_LISTAGEM):
+    """
+    Imprime uma lista de itens ("  • item") com uma única escrita no console.
+    
+    Listas longas são resumidas aos primeiros `limite` itens, a menos que
+    COVER_CHECK_VERBOSE=1 esteja definido.
+    """
+    if VERBOSO or len(itens) <= limite:
+        mensagens = [f"  • {item}" for item in itens]
+    else:
+        mensagens = [f"  • {item}" for item in itens[:limite]]
+        mensagens.append(f"  ... e mais {len(itens) - limite} (COVER_CHECK_VERBOSE=1 para listar todos)")
+    imprimir_info_lote(mensagens)
 
 
 def executar_comando(
     comando: List[str],
     diretorio: Optional[Path] = None,
-    verificar: bool = True
+    verificar: bool = True,
+    capturar_stdout: bool = True,
+    capturar_stderr: bool = True
 ) -> subprocess.CompletedProcess:
     """
     Executa um comando e retorna o resultado.
@@ -57,6 +110,11 @@ def executar_comando(
         comando: Lista com comando e argumentos
         diretorio: Diretório de trabalho (opcional)
         verificar: Se True, lança exceção em caso de erro
+        capturar_stdout: Se False, a saída padrão é descartada (`stdout` fica
+            None) e só `stderr` é capturado; evita acumular em memória a
+            saída de comandos verbosos que ninguém lê
+        capturar_stderr: Se False, a saída de erro é descartada (`stderr`
+            fica None); com os dois False, só o código de saída é obtido
     
     Returns:
         Resultado do comando executado
@@ -65,7 +123,8 @@ def executar_comando(
         resultado = subprocess.run(
             comando,
             cwd=diretorio,
-            capture_output=True,
+            stdout=subprocess.PIPE if capturar_stdout else subprocess.DEVNULL,
+            stderr=subprocess.PIPE if capturar_stderr else subprocess.DEVNULL,
             text=True,
             check=verificar,
             encoding='utf-8',
@@ -85,3 +144,65 @@ def executar_comando(
         imprimir_erro(f"Comando não encontrado: {comando[0]}. Certifique-se de que está instalado e no PATH.")
         raise
 
+
+def executar_comando_stream(
+    comando: List[str],
+    diretorio: Optional[Path] = None
+) -> Iterator[bytes]:
+    """
+    Executa um comando e entrega a saída padrão linha a linha (bytes, com o
+    '\\n' final), à medida que o processo a produz.
+    
+    O consumidor processa a saída enquanto o comando ainda roda, e a memória
+    não cresce com o tamanho da saída. Se o processo terminar com erro, lança
+    `subprocess.CalledProcessError` depois da última linha, como
+    `executar_comando(..., verificar=True)`.
+    
+    Args:
+        comando: Lista com comando e argumentos
+        diretorio: Diretório de trabalho (opcional)
+    
+    Yields:
+        Linhas da saída padrão
+    """
+    try:
+        processo = subprocess.Popen(
+            comando,
+            cwd=diretorio,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=1024 * 1024
+        )
+    except FileNotFoundError:
+        # Comando não encontrado (ex: git, dotnet não instalado)
+        imprimir_erro(f"Comando não encontrado: {comando[0]}. Certifique-se de que está instalado e no PATH.")
+        raise
+    
+    # stderr é drenado em paralelo: lido só ao final, um processo que
+    # escrevesse mais que o buffer do pipe nele travaria antes de fechar o stdout
+    trechos_erro: List[bytes] = []
+    leitor_erros = threading.Thread(
+        target=lambda: trechos_erro.append(processo.stderr.read()),
+        daemon=True
+    )
+    leitor_erros.start()
+    
+    with processo:
+        try:
+            yield from processo.stdout
+            processo.wait()
+        except BaseException:
+            # Consumidor interrompido (ou erro no consumo): não deixa o processo órfão
+            processo.kill()
+            raise
+        finally:
+            leitor_erros.join()
+    
+    erros = trechos_erro[0] if trechos_erro else b""
+    
+    if processo.returncode != 0:
+        imprimir_erro(f"Erro ao executar comando: {' '.join(comando)}")
+        imprimir_erro(f"Código de saída: {processo.returncode}")
+        if erros:
+            print(f"STDERR: {erros.decode('utf-8', 'replace')}")
+        raise subprocess.CalledProcessError(processo.returncode, comando, stderr=erros)